@@ -0,0 +1,67 @@
+'''
+Benchmark of Histogram arithmetic with uncertainties against the
+element-wise propagation of the uncertainties package (unumpy).
+
+usage:
+
+    python -m bench.bench_arithmetic [--shape 1000 1000]
+'''
+from __future__ import division, print_function
+
+from argparse import ArgumentParser
+from timeit import default_timer as timer
+
+import numpy as np
+from uncertainties import unumpy as unp
+
+from histogram import Histogram
+
+
+def unumpy_op(op, h1, h2):
+    '''Reference implementation used before closed-form propagation.'''
+    a = unp.uarray(h1.data, h1.uncert)
+    b = unp.uarray(h2.data, h2.uncert)
+    c = op(a, b)
+    return unp.nominal_values(c), unp.std_devs(c)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--shape', type=int, nargs='+', default=[300, 300])
+    args = parser.parse_args()
+
+    rand = np.random.RandomState(1)
+    axes = []
+    for n in args.shape:
+        axes += [n, [0, 1]]
+    h1 = Histogram(*axes, data=rand.uniform(1, 100, args.shape),
+                   uncert=rand.uniform(0, 10, args.shape))
+    h2 = Histogram(*axes, data=rand.uniform(1, 100, args.shape),
+                   uncert=rand.uniform(0, 10, args.shape))
+
+    ops = [
+        ('add', lambda a, b: a + b),
+        ('sub', lambda a, b: a - b),
+        ('mul', lambda a, b: a * b),
+        ('div', lambda a, b: a / b)]
+
+    fmt = '{:>4} {:>12} {:>12} {:>8} {:>8}'
+    print(fmt.format('op', 'unumpy (s)', 'Histogram (s)', 'speedup',
+                     'match'))
+    for name, op in ops:
+        start = timer()
+        data, uncert = unumpy_op(op, h1, h2)
+        t0 = timer() - start
+
+        start = timer()
+        h3 = op(h1, h2)
+        t1 = timer() - start
+
+        match = (np.allclose(h3.data, data) and
+                 np.allclose(h3.uncert, uncert))
+        print(fmt.format(name, '{:.4f}'.format(t0), '{:.4f}'.format(t1),
+                         '{:.0f}x'.format(t0 / t1), str(match)))
+
+
+if __name__ == '__main__':
+    main()
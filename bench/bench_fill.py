@@ -0,0 +1,56 @@
+'''
+Benchmark of Histogram.fill_from_sample against numpy.histogramdd.
+
+usage:
+
+    python -m bench.bench_fill [--sizes 1e6 1e7 1e8] [--bins 100] [--threads 8]
+'''
+from __future__ import print_function
+
+from argparse import ArgumentParser
+from timeit import default_timer as timer
+
+import numpy as np
+
+from histogram import Histogram
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        fn()
+        times.append(timer() - start)
+    return min(times)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1e6, 1e7])
+    parser.add_argument('--bins', type=int, default=100)
+    parser.add_argument('--dims', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    fmt = '{:>4} {:>10} {:>16} {:>16} {:>8}'
+    print(fmt.format('dim', 'entries', 'histogramdd (s)', 'Histogram (s)',
+                     'speedup'))
+
+    rand = np.random.RandomState(1)
+    for dim in args.dims:
+        for size in args.sizes:
+            size = int(size)
+            sample = rand.normal(5, 2, (dim, size))
+            h = Histogram(*([args.bins, [0, 10]] * dim))
+            t0 = best_of(lambda: np.histogramdd(sample.T, h.edges),
+                         args.repeat)
+            t1 = best_of(lambda: h.fill_from_sample(sample,
+                                                    threads=args.threads),
+                         args.repeat)
+            print(fmt.format(dim, size, '{:.4f}'.format(t0),
+                             '{:.4f}'.format(t1), '{:.1f}x'.format(t0 / t1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,10 @@
 from .version import version as __version__
 from .run_control import rc
 
-from .histogram_axis import HistogramAxis
+from .histogram_axis import (HistogramAxis, UniformAxis, TransformedAxis,
+                             IntegerAxis, CategoryAxis)
 from .histogram import Histogram
+from .sparse_histogram import SparseHistogram
 
 from .serialization import *
 from .graphics import *
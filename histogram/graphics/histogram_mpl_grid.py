@@ -100,7 +100,7 @@ def plothist_grid(fig, hist, xaxis=0, yaxis=1, hook=None, hook_kw={}, **kwargs):
 
             h.data[...] = data[xi,yi,...]
             if uncert is not None:
-                h.uncert[...] = uncert[xi,yi,...]
+                h.uncert = uncert[xi,yi,...]
 
             if hook is None:
                 axs[a,xi].plothist(h, color=color(h.sum().n), **kwargs)
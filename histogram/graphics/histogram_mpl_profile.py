@@ -53,16 +53,18 @@ def plothist_profile(ax,hist,axis=0,**kwargs):
     marker_par = kwargs.pop('marker_par',1)
     marker_err_par = kwargs.pop('marker_err_par',2)
 
+    fnprof = kwargs.pop('fnprof', _fn)
+    p0prof = kwargs.pop('p0prof', lambda h: _p0(h))
+
     hprof = Histogram(pax)
-    yy = np.empty((pax.nbins,))
-    dy = np.empty((pax.nbins,))
-    fit_slices_results = []
-    for i,h in enumerate(hist.slices(axis)):
-        fit_slices_results.append(h.fit(fn,p0,**kwargs))
-        popt,pcov,ptest = fit_slices_results[-1]
-        hprof.data[i] = popt[hist_par]
-        yy[i] = popt[marker_par]
-        dy[i] = popt[marker_err_par]
+    popt,pcov,ptest = hist.fit_slices(fn,p0,axis,**kwargs)
+    # fit_slices gives nan for the slices that could not be fitted
+    if np.isnan(popt).any():
+        raise ValueError('could not fit every slice of the histogram.')
+    fit_slices_results = list(zip(popt,pcov,ptest))
+    hprof.data[...] = popt[:,hist_par]
+    yy = popt[:,marker_par]
+    dy = popt[:,marker_err_par]
 
     pt0,cb = ax.plothist(hist, alpha=0.5, cmap=cmap)
 
@@ -90,8 +92,6 @@ def plothist_profile(ax,hist,axis=0,**kwargs):
     ax.set_xlim(*axlim_x)
     ax.set_ylim(*axlim_y)
 
-    fnprof = kwargs.pop('fnprof', _fn)
-    p0prof = kwargs.pop('p0prof', lambda h: _p0(h))
     if fnprof is not None:
 
         fit_prof_results = hprof.fit(fnprof,p0prof)
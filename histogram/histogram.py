@@ -5,8 +5,11 @@ from six import string_types, text_type
 import itertools as it
 
 from collections import Iterable
+from contextlib import contextmanager
 from copy import copy, deepcopy
+from multiprocessing.pool import Pool, ThreadPool
 from numbers import Integral
+from threading import Lock
 from warnings import warn
 
 import numpy as np
@@ -15,13 +18,344 @@ from scipy import stats, ndimage, interpolate
 from uncertainties import nominal_value, std_dev, ufloat
 from uncertainties import unumpy as unp
 
-from .histogram_axis import HistogramAxis
+from .histogram_axis import (HistogramAxis, UniformAxis, IntegerAxis,
+                             CategoryAxis, _SCALAR_TYPES)
 from .detail import skippable, window
 from . import rc
 
+# single coordinates of a point as opposed to arrays of them
+_COORDINATE_TYPES = _SCALAR_TYPES + string_types
+
 # ignore divide by zero (silently create nan's)
 np.seterr(divide='ignore', invalid='ignore')
 
+def _nominal_and_variance(x, flow=False):
+    """Nominal values and variances of a number, array or ufloat(s).
+
+    Both are returned as arrays transposed for broadcasting against the
+    transposed data of a histogram. Histograms give their data and
+    squared uncertainty, including flow bins if `flow` is set. The variance
+    is `None` for plain numbers.
+    """
+    if isinstance(x, Histogram):
+        if flow:
+            return x.flow_data.T, x.flow_variance.T
+        return x.data.T, x.variance.T
+    x = np.asarray(x)
+    if x.dtype == object:
+        return unp.nominal_values(x).T, (unp.std_devs(x)**2).T
+    return x.T, None
+
+def _dense(x):
+    """`x` as a :py:class:`Histogram` if it is a
+    :py:class:`SparseHistogram`."""
+    from .sparse_histogram import SparseHistogram
+    return x.todense() if isinstance(x, SparseHistogram) else x
+
+def _fold_flow(x, lo, hi):
+    """Keep regular bins ``lo:hi`` along the first axis of `x`, which has
+    flow bins, adding the others to the underflow and overflow bins."""
+    under = x[:lo + 1].sum(0, keepdims=True)
+    over = x[hi + 1:].sum(0, keepdims=True)
+    return np.concatenate([under, x[lo + 1:hi + 1], over])
+
+def _parse_axes(axes, label=None, title=None):
+    """Axes from the positional arguments of a histogram constructor.
+
+    Returns the list of :py:class:`HistogramAxis` (a :py:class:`UniformAxis`
+    when given a number of bins and limits) and the label and title,
+    which may also be given as trailing strings.
+    """
+    ret = []
+    for skip, (arg0, arg1, arg2) in skippable(window(axes, size=3)):
+        if (isinstance(arg0, Iterable) and
+                not isinstance(arg0, string_types)):
+            try:
+                arg0_array = np.asarray(arg0)
+                if (arg0_array.dtype == object) or (len(arg0_array.shape) != 1):
+                    ret.append(HistogramAxis(*arg0))
+                elif isinstance(arg1, string_types):
+                    ret.append(HistogramAxis(arg0_array, arg1))
+                    skip(1)
+                else:
+                    ret.append(HistogramAxis(arg0_array))
+            except ValueError:
+                ret.append(HistogramAxis(*arg0))
+        elif isinstance(arg0, Integral):
+            if isinstance(arg2, string_types):
+                ret.append(UniformAxis(arg0, arg1, arg2))
+                skip(2)
+            else:
+                ret.append(UniformAxis(arg0, arg1))
+                skip(1)
+        elif isinstance(arg0, HistogramAxis):
+            ret.append(arg0)
+        else:
+            assert isinstance(arg0, string_types) or arg0 is None
+            assert isinstance(arg1, string_types) or arg1 is None
+            assert arg2 is None
+            for a in (arg0, arg1):
+                if isinstance(a, string_types):
+                    if label is None:
+                        label = a
+                    elif title is None:
+                        title = a
+                    else:
+                        raise TypeError('bad argument list')
+            skip(1)
+    return ret, label, title
+
+def _asample(sample, dim):
+    """Sample of data as an array of shape `(D, N)`.
+
+    A sample given as `D` rows of strings and numbers (e.g. for a
+    :py:class:`CategoryAxis`) is an array of objects.
+    """
+    if dim > 1 and isinstance(sample, (list, tuple)) and len(sample) == dim:
+        rows = [np.ravel(r) for r in sample]
+        if len(set(r.dtype.kind in 'USO' for r in rows)) > 1:
+            ret = np.empty((dim, len(rows[0])), dtype=object)
+            for i, r in enumerate(rows):
+                ret[i] = r
+            return ret
+    sample = np.asarray(sample)
+    if sample.ndim < 2:
+        if dim == 1:
+            sample = sample.reshape(1, -1)
+        else:
+            # a single point
+            sample = sample.reshape(dim, 1)
+    elif sample.shape[0] != dim:
+        raise ValueError('sample must have shape (D, N).')
+    return sample
+
+def _flat_bins(axes, sample):
+    """Index into the flattened flow data for each point of a `(D, N)`
+    sample.
+
+    Points outside the histogram along an axis without flow bins are given
+    the index one past the last bin.
+    """
+    flat = np.zeros(sample.shape[1], dtype=np.intp)
+    outside = np.zeros(sample.shape[1], dtype=bool)
+    size = 1
+    for x, ax in zip(sample, axes):
+        if isinstance(ax, CategoryAxis):
+            b = ax.bin(x)
+        else:
+            if x.dtype == object:
+                x = x.astype(np.float64)
+            b = ax.bin(x)
+            # upper edge of the last bin is included
+            b[x == ax.max] = ax.nbins - 1
+        if ax.flow:
+            b += 1
+            n = ax.nbins + 2
+        else:
+            outside |= (b < 0)
+            outside |= (b >= ax.nbins)
+            n = ax.nbins
+        flat *= n
+        flat += b
+        size *= n
+    flat[outside] = size
+    return flat
+
+def _cut_ranges(args, dim, axis=None):
+    """Array of shape `(D, 2)` of the ranges given to a histogram's cut."""
+    rng = []
+    for a in args:
+        if isinstance(a, Iterable) and not isinstance(a, string_types):
+            rng += a
+            if len(a)== 1:
+                rng += [None]
+        else:
+            rng += [a]
+    if (len(rng) % 2) == 1:
+        rng.append(None)
+    rng = np.asarray(rng)
+    rng.shape = (-1, 2)
+
+    if axis is not None:
+        inrng = copy(rng)
+        rng = [[None, None] for _ in range(dim)]
+        rng[axis] = inrng[0]
+        rng = np.asarray(rng)
+    return rng
+
+def _poisson_fit(fcn, xx, yy, p0, jac=None, **kwargs):
+    """Binned Poisson maximum likelihood fit of `fcn` to the counts `yy`.
+
+    The negative log-likelihood and its gradient are minimized with
+    :py:func:`scipy.optimize.minimize` to which `kwargs` are passed. The
+    gradient is computed from the Jacobian given by ``jac(xx, *p)`` or by
+    forward differences evaluating `fcn` once per parameter. Returns the
+    parameters, their covariance (the inverse of the Fisher information) and
+    the values of `fcn` at the parameters found.
+    """
+    tiny = np.finfo(np.float64).tiny
+    last = {}
+
+    def jacobian(p, mu):
+        if jac is not None:
+            return np.asarray(jac(xx, *p), dtype=np.float64)
+        ret = np.empty((len(mu), len(p)))
+        for i in range(len(p)):
+            pp = np.array(p, dtype=np.float64)
+            h = np.sqrt(np.finfo(np.float64).eps) * max(1, abs(pp[i]))
+            pp[i] += h
+            ret[:, i] = (fcn(xx, *pp) - mu) / h
+        return ret
+
+    def nll(p):
+        mu = np.maximum(fcn(xx, *p), tiny)
+        J = jacobian(p, mu)
+        last['p'], last['mu'], last['J'] = np.array(p), mu, J
+        return np.sum(mu - yy * np.log(mu)), J.T.dot(1 - yy / mu)
+
+    kwargs.setdefault('method', 'L-BFGS-B')
+    res = opt.minimize(nll, np.asarray(p0, dtype=np.float64), jac=True,
+                       **kwargs)
+    if not res.success:
+        raise RuntimeError('Optimal parameters not found: ' +
+                           str(res.message))
+
+    pfit = res.x
+    if np.array_equal(last['p'], pfit):
+        mu, J = last['mu'], last['J']
+    else:
+        mu = np.maximum(fcn(xx, *pfit), tiny)
+        J = jacobian(pfit, mu)
+    try:
+        pcov = np.linalg.inv(J.T.dot(J / mu[:, None]))
+    except np.linalg.LinAlgError:
+        raise RuntimeError('Bad fit.')
+    return pfit, pcov, mu
+
+def _curve_fit(fcn, xx, yy, uncert, sel, p0, test, **kwargs):
+    """Fit `fcn` to the data `yy` at the grid points `xx` where `sel` is
+    True.
+
+    This is the part of :py:meth:`Histogram.fit` done for each set of data.
+    The selection `sel` should already exclude non-finite grid points.
+    """
+    likelihood = kwargs.pop('likelihood', None)
+    npar = len(p0)
+
+    # data selection
+    sel = sel & np.isfinite(yy)
+
+    if likelihood is not None:
+        if likelihood != 'poisson':
+            raise ValueError('likelihood must be None or "poisson".')
+        # the data are counts, all of which take part
+        uncert = None
+    elif uncert is not None:
+        # consider only finite uncertainties
+        sel &= np.isfinite(uncert)
+        if np.allclose(uncert[0], uncert):
+            # uncertainties are the same value
+            uncert = None
+        else:
+            # throw out uncertainties equal to zero
+            sel &= ~ np.isclose(uncert, 0)
+
+    if np.count_nonzero(sel) < npar:
+        raise ValueError('Not enough data.')
+
+    # make selection on grid
+    xx = np.squeeze(tuple(x[sel].astype(np.float64) for x in xx))
+
+    # make selection on data at grid points
+    yy = yy[sel].astype(np.float64)
+
+    # make selection on uncertainty
+    if uncert is not None:
+        kwargs['sigma'] = uncert[sel].astype(np.float64)
+        kwargs['absolute_sigma'] = True
+
+    # perform the fit
+    if likelihood is None:
+        # keep the last evaluations, one of which is at the parameters found
+        evaluated = []
+        def model(x, *p):
+            y = fcn(x, *p)
+            evaluated.append((p, y))
+            del evaluated[:-(npar + 2)]
+            return y
+        pfit, pcov = opt.curve_fit(model, xx, yy, p0=p0, **kwargs)
+        yyfit = next((y for p, y in reversed(evaluated)
+                      if np.array_equal(p, pfit)), None)
+        if yyfit is None:
+            yyfit = fcn(xx, *pfit)
+    else:
+        pfit, pcov, yyfit = _poisson_fit(fcn, xx, yy, p0, **kwargs)
+
+    if not isinstance(pcov, np.ndarray) or np.isinf(pcov).any():
+        raise RuntimeError('Bad fit.')
+
+    ### perform goodness of fit test
+    if test != 'none':
+        N = len(yy)
+        m = npar
+        ndf = N - m
+        dyy = yy - yyfit
+
+        # nchar is the minimum number of characters
+        # used to disambiguate goodness of fit tests.
+        # at the moment, one letter is sufficient.
+        nchar = 1
+        if test[:nchar] == 'kstest'[:nchar]:
+            # two-sided Kolmogorov-Smirov test
+            D, pval = stats.kstest(dyy,
+                        stats.norm(0, dyy.std()).cdf)
+            ptest = (D, pval)
+        elif test[:nchar] == 'shapiro'[:nchar]:
+            # Shapiro-Wilk test
+            W, pval = stats.shapiro(dyy)
+            ptest = (W, pval)
+        elif likelihood is not None:
+            # likelihood ratio to the saturated model (Poisson deviance)
+            ylogy = yy * np.log(np.where(yy > 0, yy / yyfit, 1))
+            chisq = 2 * np.sum(yyfit - yy + ylogy)
+            ptest = (chisq/ndf, stats.chi2.sf(chisq, ndf))
+        else: # test[:nchar] == 'chisquare'[:nchar]:
+            # simple Chi-squared test (as scipy.stats.chisquare which
+            # requires the sums of the data and the fit to agree)
+            chisq = np.sum(np.square(dyy) / yyfit)
+            pval = stats.chi2.sf(chisq, N - 1 - m)
+            ptest = (chisq/ndf, pval)
+
+        return pfit, pcov, ptest
+
+    return pfit, pcov
+
+def _fit_slices(args):
+    """Fit consecutive slices of a histogram in turn.
+
+    Each fit starts from the parameters found for the previous slice and is
+    repeated from `p0` if that fails. Failed fits give None.
+    """
+    fcn, p0, axes, xx, gridsel, slices, test, kwargs = args
+    results = []
+    res = None
+    for data, uncert, sel in slices:
+        # None stands for p0
+        starts = [None] if res is None else [res[0], None]
+        for start in starts:
+            if start is None and hasattr(p0, '__call__'):
+                start = p0(Histogram(*axes, data=data, uncert=uncert))
+            elif start is None:
+                start = copy(p0)
+            try:
+                res = _curve_fit(fcn, xx, data, uncert, gridsel & sel, start,
+                                 test, **kwargs)
+                break
+            except (RuntimeError, ValueError):
+                res = None
+        results.append(res)
+    return results
+
 class Histogram(object):
     """N-dimensional histogram over a continuous range.
 
@@ -37,8 +371,18 @@ class Histogram(object):
         title (str): Title of this histogram.
         data (scalar array): N-dimensional array for the filled data.
         uncert (scalar array): N-dimensional array for the uncertainty.
+        variance (scalar array): N-dimensional array for the squared
+            uncertainty. This implies ``storage='weighted'``.
         dtype (scalar type): Type of the data array. Input data will be
             converted if different.
+        flow (bool): Keep underflow and overflow bins along every axis (see
+            :py:attr:`HistogramAxis.flow` and :py:attr:`Histogram.flow_data`)
+            except those which grow (see :class:`UniformAxis`).
+        storage (str): Either ``'default'`` or ``'weighted'``. The latter
+            stores the variance (sum of squared weights) of each bin which
+            is accumulated by the fill methods and propagated through
+            arithmetic, :py:meth:`Histogram.sum`, :py:meth:`Histogram.rebin`
+            and :py:meth:`Histogram.cut`. See :py:attr:`Histogram.variance`.
 
     Example:
 
@@ -60,67 +404,59 @@ class Histogram(object):
 
         .. image:: images/histogram_1dnorm.png
     """
+    # buffer of single entries (see Histogram.buffered)
+    _buffer = None
+    _nbuffered = 0
+
     def __init__(self, *axes, **kwargs):
         label  = kwargs.pop('label' , None)
         title  = kwargs.pop('title' , None)
         data   = kwargs.pop('data'  , None)
         dtype  = kwargs.pop('dtype' , None)
         uncert = kwargs.pop('uncert', None)
+        variance = kwargs.pop('variance', None)
+        storage = kwargs.pop('storage', None)
+        flow = kwargs.pop('flow', False)
+
+        if storage is None:
+            storage = 'default' if variance is None else 'weighted'
+        if storage not in ['default', 'weighted']:
+            raise ValueError('Unknown storage: {}'.format(storage))
+        if (variance is not None) and (storage != 'weighted'):
+            raise ValueError('variance requires weighted storage.')
 
         if not axes:
             raise TypeError('you must specify at least one axis.')
 
-        self.axes = []
-        for skip, (arg0, arg1, arg2) in skippable(window(axes, size=3)):
-            if (isinstance(arg0, Iterable) and
-                    not isinstance(arg0, string_types)):
-                try:
-                    arg0_array = np.asarray(arg0)
-                    if (arg0_array.dtype == object) or (len(arg0_array.shape) != 1):
-                        self.axes.append(HistogramAxis(*arg0))
-                    elif isinstance(arg1, string_types):
-                        self.axes.append(HistogramAxis(arg0_array, arg1))
-                        skip(1)
-                    else:
-                        self.axes.append(HistogramAxis(arg0_array))
-                except ValueError:
-                    self.axes.append(HistogramAxis(*arg0))
-            elif isinstance(arg0, Integral):
-                if isinstance(arg2, string_types):
-                    self.axes.append(HistogramAxis(arg0, arg1, arg2))
-                    skip(2)
-                else:
-                    self.axes.append(HistogramAxis(arg0, arg1))
-                    skip(1)
-            elif isinstance(arg0, HistogramAxis):
-                self.axes.append(arg0)
-            else:
-                assert isinstance(arg0, string_types) or arg0 is None
-                assert isinstance(arg1, string_types) or arg1 is None
-                assert arg2 is None
-                for a in (arg0, arg1):
-                    if isinstance(a, string_types):
-                        if label is None:
-                            label = a
-                        elif title is None:
-                            title = a
-                        else:
-                            raise TypeError('bad argument list')
-                skip(1)
+        self.axes, label, title = _parse_axes(axes, label, title)
+
+        if flow:
+            for i, ax in enumerate(self.axes):
+                if not (ax.flow or ax.growth):
+                    self.axes[i] = ax.copy()
+                    self.axes[i].flow = True
 
         self.label = label
         self.title = title
 
-        shape = tuple(ax.nbins for ax in self.axes)
-
         if data is None:
-            self._data = np.zeros(shape=shape, dtype=(dtype or rc.fill_type))
+            data = np.zeros(shape=self._flow_shape,
+                            dtype=(dtype or rc.fill_type))
         else:
-            self._data = np.asarray(data)
+            data = np.asarray(data)
             if dtype is not None:
-                self._data = self._data.astype(dtype)
-            assert self._data.shape == shape, 'Data shape must match axes.'
-
+                data = data.astype(dtype)
+        self._set_flow_data(self._with_flow(data))
+
+        if storage == 'weighted':
+            # Poisson statistics of whatever is already in data
+            self._set_flow_variance(self.flow_data.astype(np.float64))
+            if variance is not None:
+                variance = np.asarray(variance)
+                if variance.shape == self._flow_shape:
+                    self.flow_variance[...] = variance
+                else:
+                    self.variance = variance
         if uncert is not None:
             self.uncert = uncert
 
@@ -156,15 +492,141 @@ class Histogram(object):
 
         .. image:: images/histogram_data_1dnorm.png
         """
+        if self._nbuffered:
+            self.flush()
         return self._data
 
     @data.setter
     def data(self, d):
+        # buffered entries were filled before the data is replaced
+        if self._nbuffered:
+            self.flush()
         self._data[...] = d
 
+    def _cached(self, name, compute):
+        """Value of ``compute()`` kept in the attribute `name` until the
+        data changes.
+
+        The data can be modified in-place through any reference to it so it
+        is compared with a copy taken when the value was computed.
+        """
+        data = self.data
+        snapshot, value = getattr(self, name, (None, None))
+        if not (snapshot is not None and
+                snapshot.shape == data.shape and
+                snapshot.dtype == data.dtype and
+                np.all((snapshot == data) |
+                       ((snapshot != snapshot) & (data != data)))):
+            value = compute()
+            setattr(self, name, (data.copy(), value))
+        return value
+
+    @property
+    def has_flow(self):
+        """True if any axis keeps underflow and overflow bins."""
+        return any(ax.flow for ax in self.axes)
+
+    @property
+    def flow_data(self):
+        """:py:class:`numpy.ndarray` of the filled data including flow bins.
+
+        Along each axis with :py:attr:`HistogramAxis.flow` set, the first
+        index is the underflow bin and the last is the overflow bin. Entries
+        exactly on the upper edge of an axis are in the last regular bin and
+        ``nan`` is counted as overflow. :py:attr:`Histogram.data` is a view
+        of the regular bins of this array. Without flow bins, this is the
+        same as :py:attr:`Histogram.data`.
+
+        Example::
+
+            from histogram import Histogram
+
+            h = Histogram(4, [0, 4], flow=True)
+            h.fill([-1, 0, 1, 4, 5, 6])
+            print(h.data)
+            print(h.flow_data)
+
+        output::
+
+            [1 1 0 1]
+            [1 1 1 0 1 2]
+        """
+        if self._nbuffered:
+            self.flush()
+        return getattr(self, '_flow_data', self._data)
+
+    @property
+    def flow_variance(self):
+        """Variance including flow bins (see :py:attr:`Histogram.flow_data`).
+
+        For weighted storage, this is the stored array and can be modified
+        in-place. Otherwise, the flow bins assume Poisson statistics.
+        """
+        if self._nbuffered:
+            self.flush()
+        if hasattr(self, '_variance'):
+            return getattr(self, '_flow_variance', self._variance)
+        if not self.has_flow:
+            return self.variance
+        var = self.flow_data.astype(np.float64)
+        var[self._inner] = self.variance
+        return var
+
+    @property
+    def _flow_shape(self):
+        """Shape of the data including flow bins."""
+        return tuple(ax.nbins + 2 if ax.flow else ax.nbins
+                     for ax in self.axes)
+
+    @property
+    def _inner(self):
+        """Index of the regular bins in :py:attr:`Histogram.flow_data`."""
+        return tuple(slice(1, -1) if ax.flow else slice(None)
+                     for ax in self.axes)
+
+    def _with_flow(self, a):
+        """Array `a` with flow bins (zero) added if it does not have them."""
+        shape = tuple(ax.nbins for ax in self.axes)
+        if self.has_flow and a.shape != shape:
+            assert a.shape == self._flow_shape, 'Data shape must match axes.'
+            return a
+        assert a.shape == shape, 'Data shape must match axes.'
+        if self.has_flow:
+            full = np.zeros(self._flow_shape, dtype=a.dtype)
+            full[self._inner] = a
+            return full
+        return a
+
+    def _set_flow_data(self, full):
+        """Store data array which includes flow bins."""
+        if self._nbuffered:
+            self.flush()
+        if self.has_flow:
+            self._flow_data = full
+            self._data = full[self._inner]
+        else:
+            self._data = full
+
+    def _set_flow_variance(self, full):
+        """Store (weighted) variance array which includes flow bins."""
+        if self.has_flow:
+            self._flow_variance = full
+            self._variance = full[self._inner]
+        else:
+            self._variance = full
+
     @property
     def has_uncert(self):
-        return hasattr(self, '_uncert')
+        return hasattr(self, '_uncert') or hasattr(self, '_variance')
+
+    @property
+    def storage(self):
+        """Storage type of this histogram: 'default' or 'weighted'.
+
+        Weighted histograms store the variance of each bin (see
+        :py:attr:`Histogram.variance`).
+        """
+        return 'weighted' if hasattr(self, '_variance') else 'default'
 
     @property
     def uncert(self):
@@ -200,23 +662,69 @@ class Histogram(object):
             pyplot.show()
 
         .. image:: images/histogram_uncert_1dnorm.png
+
+        For weighted storage, this is the square-root of
+        :py:attr:`Histogram.variance`.
         """
-        return getattr(self, '_uncert', np.sqrt(self.data))
+        if self._nbuffered:
+            self.flush()
+        if hasattr(self, '_uncert'):
+            return self._uncert
+        if hasattr(self, '_variance'):
+            return np.sqrt(self._variance)
+        return np.sqrt(self._data)
 
     @uncert.setter
     def uncert(self, u):
         if u is None:
             del self.uncert
+        elif hasattr(self, '_variance'):
+            self.variance = np.square(u)
         else:
-            if not self.has_uncert:
+            if not hasattr(self, '_uncert'):
                 self._uncert = np.empty(self.data.shape, dtype=np.float64)
             self._uncert[...] = u
 
     @uncert.deleter
     def uncert(self):
-        if self.has_uncert:
+        if hasattr(self, '_variance'):
+            self.flow_variance[...] = self.flow_data
+        elif hasattr(self, '_uncert'):
             del self._uncert
 
+    @property
+    def variance(self):
+        """:py:class:`numpy.ndarray` of the squared uncertainty.
+
+        For weighted storage, this is the stored sum of squared weights of
+        each bin and can be modified in-place. Otherwise, this is a new
+        array: the square of :py:attr:`Histogram.uncert`.
+
+        Example::
+
+            from histogram import Histogram
+
+            h = Histogram(10, [0, 10], storage='weighted', dtype=float)
+            h.fill([1, 1, 2], [0.5, 0.5, 2])
+            print(h.variance[:3])
+
+        output::
+
+            [ 0.   0.5  4. ]
+        """
+        if self._nbuffered:
+            self.flush()
+        if hasattr(self, '_variance'):
+            return self._variance
+        return np.square(self.uncert)
+
+    @variance.setter
+    def variance(self, v):
+        if hasattr(self, '_variance'):
+            self._variance[...] = v
+        else:
+            self.uncert = np.sqrt(v)
+
     @property
     def uncert_ratio(self):
         """The untertainty as ratios of the data"""
@@ -319,6 +827,8 @@ class Histogram(object):
         for a, aa in zip(self.axes, that.axes):
             if not a.isidentical(aa):
                 return False
+        if not np.allclose(self.flow_data, that.flow_data):
+            return False
         return True
 
 ### non-modifying information getters
@@ -351,13 +861,15 @@ class Histogram(object):
         fmt = 'Histogram({axes}, {args})'
         axesstr = ', '.join(repr(a) for a in self.axes)
         args = {
-            'data': repr(self.data.tolist()),
+            'data': repr(self.flow_data.tolist()),
             'dtype':'"{}"'.format(str(self.data.dtype)) }
         if self.label is not None:
             args['label'] = '"{}"'.format(self.label)
         if self.title is not None:
             args['title'] = '"{}"'.format(self.title)
-        if self.has_uncert:
+        if self.storage == 'weighted':
+            args['variance'] = str(self.flow_variance.tolist())
+        elif self.has_uncert:
             args['uncert'] = str(self.uncert.tolist())
         argsstr = ', '.join('{}={}'.format(k, v)
                             for k, v in sorted(args.items()))
@@ -371,11 +883,20 @@ class Histogram(object):
 
         Args:
             xx (tuple of numbers or arrays): Point(s) inside the axes of this
-                histogram.
+                histogram. Arrays are broadcast against each other.
 
         Keyword Args:
             overflow_value (number): Return value when the point lies outside
                 this histogram. (default: 0)
+            uncert (bool): Also return the uncertainty at each point (zero
+                outside of this histogram). (default: False)
+            chunksize (int): Number of points binned at a time which bounds
+                the temporary memory used for arrays of points. (default:
+                ``rc.fill.chunksize``)
+
+        Returns:
+            The value (or array of values shaped like the broadcast points)
+            or a tuple of the values and uncertainties if `uncert` is True.
 
         Example::
 
@@ -395,17 +916,221 @@ class Histogram(object):
             428
             909
 
+        Arrays of points are binned along each axis (see
+        :py:meth:`HistogramAxis.bin`) and the values gathered with a single
+        :py:meth:`numpy.ndarray.take` per chunk::
+
+            effmap = Histogram(50, [0, 100], 20, [-2.5, 2.5],
+                               data=np.random.uniform(0.8, 1, (50, 20)))
+            pt, eta = np.random.uniform(0, 100, (2, 10**7))
+            eff = effmap(pt, eta, overflow_value=1)
         """
         overflow_value = kwargs.pop('overflow_value', 0)
+        with_uncert = kwargs.pop('uncert', False)
+        chunksize = kwargs.pop('chunksize', None) or rc.fill.chunksize
+        if __debug__:
+            if len(xx) != self.dim:
+                raise ValueError('number of coordinates must match the'
+                                 ' dimension of the histogram.')
+
+        if all(isinstance(x, _COORDINATE_TYPES) for x in xx):
+            b = []
+            for x, ax in zip(xx, self.axes):
+                i = ax.bin(x)
+                if i < 0 or i >= ax.nbins:
+                    return (overflow_value, 0) if with_uncert else overflow_value
+                b.append(i)
+            b = tuple(b)
+            if with_uncert:
+                return self.data[b], self.uncert[b]
+            return self.data[b]
+
+        xx = np.broadcast_arrays(*[np.asarray(x) for x in xx])
+        shape = xx[0].shape
+        xx = [x.reshape(-1) for x in xx]
+        size = xx[0].size
+        data = self.data.reshape(-1)
+        ret = np.empty(size, dtype=np.result_type(data, overflow_value))
+        if with_uncert:
+            uncert = self.uncert.reshape(-1)
+            ret_uncert = np.empty(size, dtype=uncert.dtype)
+
+        for start in range(0, size, chunksize):
+            chunk = slice(start, start + chunksize)
+            flat = 0
+            outside = False
+            for x, ax in zip(xx, self.axes):
+                b = ax.bin(x[chunk])
+                outside = outside | (b < 0) | (b >= ax.nbins)
+                flat = flat * ax.nbins + b
+            flat[outside] = 0
+            ret[chunk] = data.take(flat)
+            ret[chunk][outside] = overflow_value
+            if with_uncert:
+                ret_uncert[chunk] = uncert.take(flat)
+                ret_uncert[chunk][outside] = 0
+
+        ret = ret.reshape(shape)[()]
+        if with_uncert:
+            return ret, ret_uncert.reshape(shape)[()]
+        return ret
 
-        bin = []
-        for x, ax in zip(xx, self.axes):
-            b = ax.bin(x)
-            if (b < 0) or (b >= ax.nbins):
-                return overflow_value
-            bin += [b]
+    def interpolator(self, method='linear', fill_value=np.nan):
+        """Interpolating function of the data of this histogram
+
+        The data is taken as the value at the bin-centers (see
+        :py:meth:`Histogram.grid`) and is interpolated between them with a
+        spline of order one (``'linear'``) or three (``'cubic'``) along each
+        axis using :py:func:`scipy.ndimage.map_coordinates`. The spline
+        coefficients are computed once and cached until the data is modified
+        so repeated calls to this method are cheap. The returned function
+        keeps the data as it was when it was created.
+
+        Keyword Args:
+            method (str): ``'linear'`` or ``'cubic'``. (default: ``'linear'``)
+            fill_value (number): Value returned for points outside the range
+                of the bin-centers along any axis. If None, such points take
+                the value at the nearest bin-center instead. (default:
+                ``numpy.nan``)
 
-        return self.data[tuple(bin)]
+        Returns:
+            callable: Function of the point(s) ``(x, y...)`` which returns
+            the interpolated value (or array of values shaped like the
+            broadcast points).
+
+        Example::
+
+            effmap = Histogram(50, [0, 100], 20, [-2.5, 2.5],
+                               data=np.random.uniform(0.8, 1, (50, 20)))
+            f = effmap.interpolator('cubic', fill_value=None)
+            pt, eta = np.random.uniform(0, 100, (2, 10**6))
+            eff = f(pt, eta)
+        """
+        orders = {'linear': 1, 'cubic': 3}
+        if method not in orders:
+            raise ValueError('method must be one of: ' +
+                             ', '.join(sorted(orders)))
+        order = orders[method]
+
+        cache = self._cached('_interpolators', dict)
+        key = (method, fill_value)
+        if key in cache:
+            return cache[key]
+
+        values = np.array(self.data, dtype=np.float64)
+        if order > 1:
+            values = ndimage.spline_filter(values, order=order,
+                                           output=np.float64)
+        centers = [ax.bincenters() for ax in self.axes]
+        indices = [np.arange(len(c), dtype=np.float64) for c in centers]
+
+        def interpolate(*xx):
+            if __debug__:
+                if len(xx) != len(centers):
+                    raise ValueError('number of coordinates must match the'
+                                     ' dimension of the histogram.')
+            xx = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64)
+                                       for x in xx])
+            shape = xx[0].shape
+            coords = np.empty((len(xx), xx[0].size), dtype=np.float64)
+            outside = False
+            for c, x, cent, idx in zip(coords, xx, centers, indices):
+                x = x.reshape(-1)
+                c[:] = np.interp(x, cent, idx)
+                if fill_value is not None:
+                    outside = outside | ~((x >= cent[0]) & (x <= cent[-1]))
+            ret = ndimage.map_coordinates(values, coords, order=order,
+                                          mode='mirror', prefilter=False)
+            if np.any(outside):
+                ret = ret.astype(np.result_type(ret, fill_value))
+                ret[outside] = fill_value
+            return ret.reshape(shape)[()]
+
+        cache[key] = interpolate
+        return interpolate
+
+    def sample(self, n, rng=None, chunksize=None):
+        """Random sample distributed according to the data of this histogram
+
+        Bins are drawn with a probability proportional to their content by
+        inverting the cumulative sum of the (flattened) data which is
+        computed once and cached until the data is modified. Points are then
+        placed uniformly within the edges of each drawn bin. Integer and
+        category axes give the value of the drawn bin instead.
+
+        Args:
+            n (int): Number of points.
+
+        Keyword Args:
+            rng (int or numpy.random.RandomState): Seed or source of random
+                numbers (anything with a ``uniform`` method like
+                :py:class:`numpy.random.Generator`). (default:
+                :py:mod:`numpy.random`)
+            chunksize (int): Number of points drawn at a time which bounds
+                the temporary memory used. The sample drawn for a given seed
+                depends on it. (default: ``rc.fill.chunksize``)
+
+        Returns:
+            numpy.ndarray: Sample of shape `(D, n)` where `D` is the dimension
+            of this histogram as accepted by
+            :py:meth:`Histogram.fill_from_sample`. If any axis has
+            non-numeric categories, this is a list of `D` arrays instead.
+
+        Example::
+
+            h = Histogram(100, [0, 10], 100, [0, 10])
+            h.fill(np.random.normal(5, 2, (2, 10000)))
+            toy = Histogram(100, [0, 10], 100, [0, 10])
+            toy.fill_from_sample(h.sample(10**7, rng=1))
+        """
+        if rng is None:
+            rng = np.random
+        elif isinstance(rng, Integral):
+            rng = np.random.RandomState(rng)
+        chunksize = chunksize or rc.fill.chunksize
+
+        data = self.data
+
+        def cumulative():
+            if __debug__:
+                if not (np.all(np.isfinite(data)) and np.all(data >= 0)):
+                    raise ValueError('data must be finite and non-negative'
+                                     ' to sample from a histogram.')
+            cdf = np.cumsum(data.reshape(-1), dtype=np.float64)
+            if not (cdf.size and cdf[-1] > 0):
+                raise ValueError('can not sample from an empty histogram.')
+            return cdf
+        cdf = self._cached('_sample_cdf', cumulative)
+
+        # (values at the lower edge, bin widths or None if discrete)
+        rows = []
+        ret = np.empty((self.dim, n), dtype=np.float64)
+        for ax in self.axes:
+            if isinstance(ax, IntegerAxis):
+                rows.append((np.arange(ax.start, ax.stop), None))
+            elif isinstance(ax, CategoryAxis):
+                rows.append((ax.categories, None))
+                if not np.issubdtype(ax.categories.dtype, np.number):
+                    ret = ret.astype(object)
+            else:
+                e = ax.edges
+                rows.append((e[:-1], np.diff(e)))
+
+        for start in range(0, n, chunksize):
+            chunk = slice(start, min(start + chunksize, n))
+            size = chunk.stop - chunk.start
+            flat = np.searchsorted(cdf, rng.uniform(0, cdf[-1], size),
+                                   side='right')
+            np.minimum(flat, cdf.size - 1, out=flat)
+            bins = np.unravel_index(flat, data.shape)
+            for x, b, (values, widths) in zip(ret, bins, rows):
+                x[chunk] = values.take(b)
+                if widths is not None:
+                    x[chunk] += widths.take(b) * rng.uniform(0, 1, size)
+
+        if ret.dtype == object:
+            return [np.array(row.tolist()) for row in ret]
+        return ret
 
     def asdict(self, encoding=None, flat=False):
         """Dictionary representation of this histogram.
@@ -415,7 +1140,7 @@ class Histogram(object):
         :py:func:`save_histogram_to_npz`).
 
         """
-        ret = {'data' : self.data}
+        ret = {'data' : self.flow_data}
         if flat:
             for i, ax in enumerate(self.axes):
                 for k, v in ax.asdict(encoding).items():
@@ -423,7 +1148,9 @@ class Histogram(object):
                     ret[key] = v
         else:
             ret['axes'] = [a.asdict(encoding) for a in self.axes]
-        if self.has_uncert:
+        if self.storage == 'weighted':
+            ret['variance'] = self.flow_variance
+        elif self.has_uncert:
             ret['uncert'] = self.uncert
         if self.label is not None:
             if encoding is not None:
@@ -445,12 +1172,9 @@ class Histogram(object):
         else:
             axes = []
             for i in range(d['data'].ndim):
-                axdict = {}
-                for k in ['edges', 'label']:
-                    key = 'axes:{}:{}'.format(i, k)
-                    if key in d:
-                        axdict[k] = d.pop(key)
-                axes.append(axdict)
+                prefix = 'axes:{}:'.format(i)
+                keys = [k for k in d if k.startswith(prefix)]
+                axes.append({k[len(prefix):]: d.pop(k) for k in keys})
             axes = [HistogramAxis.fromdict(a, encoding) for a in axes]
         if encoding is not None:
             if 'label' in d:
@@ -614,6 +1338,13 @@ class Histogram(object):
         if not self.has_uncert and axes == all_axes:
             s = self.data.sum()
             result = ufloat(s, np.sqrt(s))
+        elif self.storage == 'weighted':
+            s = np.sum(self.data, axis=axes)
+            v = np.sum(self._variance, axis=axes)
+            if axes == all_axes:
+                result = ufloat(s, np.sqrt(v))
+            else:
+                result = unp.uarray(s, np.sqrt(v))
         else:
             result = np.sum(unp.uarray(self.data, self.uncert), axis=axes)
         return result
@@ -647,23 +1378,32 @@ class Histogram(object):
 
             sum of h: 10
             h2 sum along axis 0: [0 6 4 0 0 0 0 0 0 0]
+
+        Flow bins of the summed axes are not included. Those of the
+        remaining axes are kept.
         """
         all_axes = tuple(range(self.dim))
         axes = all_axes if len(axes) == 0 else tuple(sorted(axes))
         if axes == all_axes:
             return self.sum_data()
         else:
-            if self.has_uncert:
+            inner = self._inner
+            sel = tuple(inner[i] if i in axes else slice(None)
+                        for i in all_axes)
+            newdata = np.sum(self.flow_data[sel], axis=axes)
+            newuncert = None
+            newvariance = None
+            if self.storage == 'weighted':
+                newvariance = np.sum(self.flow_variance[sel], axis=axes)
+            elif self.has_uncert:
                 result = self.sum_data(*axes)
-                newdata = unp.nominal_values(result)
+                newdata = newdata.astype(np.float64)
                 newuncert = unp.std_devs(result)
-            else:
-                newdata = np.sum(self.data, axis=axes)
-                newuncert = None
             ii = sorted(set(range(self.dim)) - set(axes))
             newaxes = [self.axes[i] for i in ii]
             return Histogram(*newaxes, data=newdata, uncert=newuncert,
-                             title=copy(self.title), label=copy(self.label))
+                             variance=newvariance, title=copy(self.title),
+                             label=copy(self.label))
 
     def projection_data(self, axis):
         """Projection of the data onto an axis."""
@@ -777,10 +1517,13 @@ class Histogram(object):
         for ax in self.axes[:maxdim]:
             ext += [ax.min, ax.max]
         if len(ext) < (2*maxdim):
+            data = self.data
             if uncert:
-                ext += [self.min(), self.max()]
+                # the uncertainty is evaluated once for both limits
+                u = self.uncert
+                ext += [np.nanmin(data - u), np.nanmax(data + u)]
             else:
-                ext += [np.nanmin(self.data), np.nanmax(self.data)]
+                ext += [np.nanmin(data), np.nanmax(data)]
         if pad is not None:
             if not isinstance(pad, Iterable):
                 pad = [pad]*(2*maxdim)
@@ -803,7 +1546,7 @@ class Histogram(object):
             for x, ax in zip(ret, self.axes):
                 x /= ax.range
             if maxdim > self.dim:
-                ret[-1] /= self.data.max() - self.data.min()
+                ret[-1] = ret[-1] / (self.data.max() - self.data.min())
 
         return ret
 
@@ -844,37 +1587,38 @@ class Histogram(object):
         if uncert is None:
             del self.uncert
         else:
-            if not self.has_uncert:
-                self._uncert = np.empty(self.data.shape)
-            if isinstance(uncert, np.ndarray):
-                self.uncert.T[...] = uncert.T
-            else:
-                self.uncert[...] = uncert
+            u = np.empty(self.data.shape)
+            u.T[...] = np.asarray(uncert).T
+            self.uncert = u
 
     def set_nans(self, val=0, uncert=0):
         """Set all NaNs to a specific value."""
         self.data[np.isnan(self.data)] = val
         if self.has_uncert:
-            self.uncert[np.isnan(self.uncert)] = uncert
+            u = self.uncert
+            self.uncert = np.where(np.isnan(u), uncert, u)
 
     def set_infs(self, val=0, uncert=0):
         """Set all infinity values to a specific value."""
         self.data[np.isinf(self.data)] = val
         if self.has_uncert:
-            self.uncert[np.isinf(self.uncert)] = uncert
+            u = self.uncert
+            self.uncert = np.where(np.isinf(u), uncert, u)
 
     def set_nonfinites(self, val=0, uncert=0):
         """Set all non-finite values to a specific value."""
         self.data[~np.isfinite(self.data)] = val
         if self.has_uncert:
-            self.uncert[~np.isfinite(self.uncert)] = uncert
+            u = self.uncert
+            self.uncert = np.where(np.isfinite(u), u, uncert)
 
     def reset(self):
-        """Set data to zero and uncertainty to `None`."""
+        """Set data, including flow bins, to zero and uncertainty to `None`."""
+        self.flow_data[...] = 0
         self.set(0)
         self.uncert = None
 
-    def fill(self, *args):
+    def fill(self, *args, **kwargs):
         """Fill histogram with sample data.
 
         Arguments (``\*args``) are the sample of data with optional associated
@@ -908,15 +1652,23 @@ class Histogram(object):
             # [[0 1 2 0 0 0 0 0 0 0]
             #  [0 0 0 3 4 0 0 0 0 0]
             #  [0 0 0 0 0 5 0 0 0 0]]
+
+        The weights may also be given as the keyword argument ``weights``
+        which is required for weight variations (see
+        :py:meth:`Histogram.fill_from_sample`). Other keyword arguments
+        (``threads``) are passed on to :py:meth:`Histogram.fill_from_sample`.
         """
-        if len(args) > self.dim:
+        if 'weights' in kwargs:
+            sample = args
+            weights = kwargs.pop('weights')
+        elif len(args) > self.dim:
             sample = args[:-1]
             weights = args[-1]
         else:
             sample = args
             weights = None
 
-        self.fill_from_sample(sample, weights)
+        self.fill_from_sample(sample, weights, **kwargs)
 
     def fill_one(self, pt, wt=1):
         """Fill a single data point
@@ -925,21 +1677,91 @@ class Histogram(object):
         method for a single entry, it should only be used as a last resort
         because its at least an order of magnitude slower than
         :py:meth:`Histogram.fill_from_sample` when filling many entries.
+        If many entries must be filled one at a time, use it within
+        :py:meth:`Histogram.buffered`.
 
         """
-        try:
-            if pt < self.axes[0].min or self.axes[0].max < pt:
+        if self._buffer is not None:
+            n = self._nbuffered
+            self._buffer[:, n] = pt
+            self._buffer_weights[n] = wt
+            self._nbuffered = n + 1
+            if n + 1 == self._buffer.shape[1]:
+                self.flush()
+            return
+        if any(ax.growth for ax in self.axes):
+            self._grow(np.reshape(np.asarray(pt, dtype=np.float64), (-1, 1)))
+        if isinstance(pt, _SCALAR_TYPES):
+            pt = (pt,)
+        elif not isinstance(pt, tuple):
+            pt = np.ravel(pt)
+        b = []
+        for x, ax in zip(pt, self.axes):
+            if x == ax.max and not isinstance(ax, CategoryAxis):
+                # upper edge of the last bin is included
+                i = ax.nbins - 1
+            else:
+                i = ax.bin(x)
+            if ax.flow:
+                i += 1
+            elif i < 0 or i >= ax.nbins:
                 return
-            self.data[self.axes[0].bin(pt)] += wt
-        except ValueError:
-            b = []
-            for x, ax, m in zip(pt, self.axes, self.data.shape):
-                if x < ax.min or ax.max < x:
-                    return
-                b += [ax.bin(x)]
-            self.data[tuple(b)] += wt
+            b.append(i)
+        b = tuple(b)
+        self.flow_data[b] += wt
+        if self.storage == 'weighted':
+            self.flow_variance[b] += wt**2
+
+    @contextmanager
+    def buffered(self, size=None):
+        """Context in which :py:meth:`Histogram.fill_one` is buffered.
+
+        Within this context, each call to :py:meth:`Histogram.fill_one`
+        only copies the point and weight into a preallocated buffer of
+        ``size`` entries (default: ``rc.fill.buffer_size``). The buffer is
+        filled with :py:meth:`Histogram.fill_from_sample` when it is full,
+        when the data, variance or uncertainty is accessed, on
+        :py:meth:`Histogram.flush` and when leaving the context.
+
+        Example::
+
+            import numpy as np
+            from histogram import Histogram
 
-    def fill_from_sample(self, sample, weights=None):
+            h = Histogram(100, [0, 10], 100, [0, 10])
+            with h.buffered():
+                for x, y in np.random.normal(5, 2, (10000, 2)):
+                    h.fill_one((x, y))
+        """
+        if self._buffer is not None:
+            yield self
+            return
+        if size is None:
+            size = rc.fill.buffer_size
+        # the points are binned as given when the buffer is filled
+        if any(isinstance(ax, CategoryAxis) for ax in self.axes):
+            dtype = object
+        else:
+            dtype = np.float64
+        self._buffer = np.empty((self.dim, size), dtype=dtype)
+        self._buffer_weights = np.empty(size, dtype=np.float64)
+        try:
+            yield self
+        finally:
+            self.flush()
+            del self._buffer, self._buffer_weights
+
+    def flush(self):
+        """Fill the entries buffered by :py:meth:`Histogram.fill_one`."""
+        n = self._nbuffered
+        if n:
+            self._nbuffered = 0
+            weights = self._buffer_weights[:n]
+            if np.all(weights == 1):
+                weights = None
+            self.fill_from_sample(self._buffer[:, :n], weights)
+
+    def fill_from_sample(self, sample, weights=None, threads=None):
         """Fill histogram from sample of data
 
         This fills the histogram from sample with shape `(D, N)` array where `D`
@@ -947,6 +1769,18 @@ class Histogram(object):
         fill. The optional ``weights`` may be a single number or an array of
         length `N`. The default (``None``) is equivalent to ``weights = 1``.
 
+        For weighted storage, the squared weights are accumulated into
+        :py:attr:`Histogram.variance` using the same bin indexes.
+
+        Setting ``threads`` (default: ``rc.fill.threads``) to more than one
+        splits the sample among that many threads. Each thread bins its part
+        in chunks of ``rc.fill.chunksize`` entries into its own partial
+        histogram and the partials are added together at the end. Only the
+        binning (the arithmetic and :py:func:`numpy.searchsorted` calls,
+        which release the GIL) runs concurrently; the accumulation with
+        :py:func:`numpy.bincount` holds the GIL and is serialized across the
+        threads, so the speed-up is limited to the binning part of the fill.
+
         This is the primary work-horse of the :py:class:`Histogram` class and
         should be favored, along with the wrapper method
         :py:meth:`Histogram.fill` over :py:meth:`Histogram.fill_one`.
@@ -971,16 +1805,421 @@ class Histogram(object):
             pyplot.show()
 
         .. image:: images/histogram_fill_from_sample.png
+
+        Bins are found arithmetically along uniform axes and by a binary
+        search along the others (see :py:meth:`HistogramAxis.bin`). The
+        entries are then accumulated in a single call to
+        :py:func:`numpy.bincount`. As with :py:func:`numpy.histogramdd`, the
+        last bin of each axis includes its upper edge.
+
+        Weight variations (e.g. systematic variations) are filled in a
+        single pass when ``weights`` has shape `(K, N)`. The last axis of
+        this histogram then has `K` bins, one per variation, and the sample
+        has one dimension less than the histogram. The sample is binned once
+        followed by one :py:func:`numpy.bincount` per variation::
+
+            import numpy as np
+            from histogram import Histogram
+
+            x = np.random.normal(5, 2, 10000)
+            variations = np.random.uniform(0.9, 1.1, (100, 10000))
+
+            h = Histogram(10, [0, 10], 100, [0, 100], 'variation')
+            h.fill(x, weights=variations)
+
+            # one histogram per variation
+            hists = list(h.slices(1))
+
+        Axes which grow (see :class:`UniformAxis`) are first extended to
+        include all finite points of the sample.
+        """
+        if threads is None:
+            threads = rc.fill.threads
+        wt = self._weights_array(weights)
+        if wt is not None and wt.ndim == 2:
+            sample = _asample(sample, self.dim - 1)
+            self._grow(sample)
+            self._fill_variations(sample, wt)
+            return
+        sample = _asample(sample, self.dim)
+        self._grow(sample)
+        if threads > 1:
+            sumw, sumw2 = self._count_threaded(sample, wt, threads)
+        else:
+            sumw, sumw2 = self._count(sample, wt)
+        self._add_counts(sumw, sumw2, weights)
+
+    def _grow(self, sample):
+        """Extend the growing axes to include the finite points of the
+        `(D, N)` sample (D may be less than the dimension)."""
+        pads = [(0, 0)] * self.dim
+        for i, (x, ax) in enumerate(zip(sample, self.axes)):
+            if not ax.growth or not len(x):
+                continue
+            low, high = x.min(), x.max()
+            if ax.min <= low and high <= ax.max:
+                continue
+            x = x[np.isfinite(x)]
+            if not len(x):
+                continue
+            self.axes[i], below, above = ax._grown(x.min(), x.max())
+            pads[i] = (below, above)
+        if any(lo or hi for lo, hi in pads):
+            self._grow_arrays(pads)
+
+    def _grow_arrays(self, pads):
+        """Add ``(below, above)`` empty bins along each axis of the data,
+        variance and uncertainty.
+
+        The data and variance are views into zeroed blocks with room
+        reserved on both sides along grown axes. The content is copied (and
+        the blocks doubled along the grown axes) only when that room is
+        used up.
+        """
+        arrays = [getattr(self, '_flow_data', self._data)]
+        if hasattr(self, '_variance'):
+            arrays.append(getattr(self, '_flow_variance', self._variance))
+        shape = tuple(n + lo + hi for n, (lo, hi) in zip(arrays[0].shape, pads))
+        blocks, start = getattr(self, '_grow_blocks', (None, None))
+        if (blocks is not None and len(blocks) == len(arrays) and
+                all(a.base is b for a, b in zip(arrays, blocks))):
+            start = tuple(s - lo for s, (lo, hi) in zip(start, pads))
+            if any(s < 0 or s + n > c for s, n, c in
+                   zip(start, shape, blocks[0].shape)):
+                blocks = None
+        else:
+            blocks = None
+        if blocks is None:
+            capacity = tuple(2 * n if lo or hi else n
+                             for n, (lo, hi) in zip(shape, pads))
+            start = tuple((c - n) // 2 for c, n in zip(capacity, shape))
+            blocks = []
+            for a in arrays:
+                b = np.zeros(capacity, dtype=a.dtype)
+                b[tuple(slice(s + lo, s + lo + n) for s, (lo, hi), n in
+                        zip(start, pads, a.shape))] = a
+                blocks.append(b)
+        self._grow_blocks = (blocks, start)
+        view = tuple(slice(s, s + n) for s, n in zip(start, shape))
+        self._set_flow_data(blocks[0][view])
+        if len(blocks) > 1:
+            self._set_flow_variance(blocks[1][view])
+        if hasattr(self, '_uncert'):
+            self._uncert = np.pad(self._uncert, pads, 'constant')
+
+    def _fill_variations(self, sample, weights):
+        """Fill each row of `weights` of shape `(K, N)` into the
+        corresponding bin of the last axis."""
+        ax = self.axes[-1]
+        if weights.shape[0] != ax.nbins:
+            raise ValueError('number of weight variations must match the'
+                             ' number of bins of the last axis.')
+        flat = _flat_bins(self.axes[:-1], sample)
+        shape = self._flow_shape
+        n = int(np.prod(shape[:-1]))
+        sumw = np.zeros((n, shape[-1]))
+        sumw2 = None
+        if self.storage == 'weighted':
+            sumw2 = np.zeros((n, shape[-1]))
+        offset = 1 if ax.flow else 0
+        for k, w in enumerate(weights):
+            sumw[:, k + offset] = np.bincount(flat, w, minlength=n + 1)[:-1]
+            if sumw2 is not None:
+                sumw2[:, k + offset] = np.bincount(flat, w**2,
+                                                   minlength=n + 1)[:-1]
+        if sumw2 is not None:
+            sumw2 = sumw2.ravel()
+        self._add_counts(sumw.ravel(), sumw2, weights)
+
+    def compute_bin_indices(self, sample):
+        """Bin index of each point of a sample for
+        :py:meth:`Histogram.fill_indices`.
+
+        This is the binning step of :py:meth:`Histogram.fill_from_sample`
+        (see also :py:meth:`HistogramAxis.bin`) returning the index of each
+        point into the flattened :py:attr:`Histogram.flow_data`. Points
+        outside the histogram get an index one past the last bin and are
+        ignored when filled (growing axes are not extended here). The
+        indices depend only on the axes so they may be used to fill any
+        histogram with identical axes.
+
+        Example::
+
+            import numpy as np
+            from histogram import Histogram
+
+            sample = np.random.normal(5, 2, (2, 10000))
+            variations = np.random.uniform(0.9, 1.1, (20, 10000))
+
+            hists = [Histogram(10, [0, 10], 10, [0, 10]) for _ in range(20)]
+            indices = hists[0].compute_bin_indices(sample)
+            for h, weights in zip(hists, variations):
+                h.fill_indices(indices, weights)
+        """
+        return _flat_bins(self.axes, _asample(sample, self.dim))
+
+    def fill_indices(self, indices, weights=None):
+        """Fill histogram from bin indices
+
+        The ``indices`` are those returned by
+        :py:meth:`Histogram.compute_bin_indices` for this histogram or one
+        with identical axes. ``weights`` are the same as for
+        :py:meth:`Histogram.fill_from_sample`. Each call is a single
+        :py:func:`numpy.bincount` (two for weighted storage).
+        """
+        indices = np.asarray(indices)
+        if __debug__:
+            if len(indices) and indices.max() > self.flow_data.size:
+                raise ValueError('bin indices do not match the axes.')
+        wt = self._weights_array(weights)
+        sumw, sumw2 = self._count_indices(indices, wt)
+        self._add_counts(sumw, sumw2, weights)
+
+    @staticmethod
+    def _weights_array(weights):
+        """Weights as a float array or `None` for no or constant weights."""
+        if weights is None or not isinstance(weights, Iterable):
+            return None
+        return np.asarray(weights, dtype=np.float64)
+
+    def _add_counts(self, sumw, sumw2, weights):
+        """Add sums of (squared) weights in each flattened bin to the data
+        (and variance).
+
+        If `weights` is a number, the counts are scaled by it here.
+        """
+        if sumw2 is None:
+            sumw2 = sumw
+            if weights is not None and not isinstance(weights, Iterable):
+                sumw2 = sumw * weights**2
+                sumw = sumw * weights
+        data = self.flow_data
+        data += sumw.reshape(data.shape).astype(data.dtype)
+        if self.storage == 'weighted':
+            variance = self.flow_variance
+            variance += sumw2.reshape(variance.shape)
+
+    def _count(self, sample, weights=None):
+        """Sums of weights and squared weights in each (flattened) bin.
+
+        The sum of squared weights is `None` unless this histogram has
+        weighted storage and ``weights`` are given.
+        """
+        return self._count_indices(_flat_bins(self.axes, sample), weights)
+
+    def _count_indices(self, flat, weights=None):
+        """Same as :py:meth:`Histogram._count` from flat bin indices."""
+        nbins = self.flow_data.size + 1
+        sumw = np.bincount(flat, weights, minlength=nbins)[:-1]
+        sumw2 = None
+        if weights is not None and self.storage == 'weighted':
+            sumw2 = np.bincount(flat, weights**2, minlength=nbins)[:-1]
+        return sumw, sumw2
+
+    def _count_threaded(self, sample, weights, threads):
+        """Same as :py:meth:`Histogram._count` using a pool of threads.
+
+        Only the binning of the parts overlaps between the threads. The
+        calls to :py:func:`numpy.bincount` hold the GIL and run one at a
+        time.
+        """
+        chunksize = rc.fill.chunksize
+        bounds = np.linspace(0, sample.shape[1], threads + 1).astype(int)
+        nbins = self.flow_data.size
+        # same types as the sums given by numpy.bincount
+        sumw_type = np.intp if weights is None else np.float64
+        weighted = weights is not None and self.storage == 'weighted'
+
+        def count_part(i):
+            # a part may have no points at all
+            sumw = np.zeros(nbins, dtype=sumw_type)
+            sumw2 = np.zeros(nbins) if weighted else None
+            for start in range(bounds[i], bounds[i + 1], chunksize):
+                stop = min(start + chunksize, bounds[i + 1])
+                wt = None if weights is None else weights[start:stop]
+                w, w2 = self._count(sample[:, start:stop], wt)
+                sumw += w
+                if weighted:
+                    sumw2 += w2
+            return sumw, sumw2
+
+        pool = ThreadPool(threads)
+        try:
+            partials = pool.map(count_part, range(threads))
+        finally:
+            pool.close()
+        sumw = sum(p[0] for p in partials)
+        sumw2 = sum(p[1] for p in partials) if weighted else None
+        return sumw, sumw2
+
+    def fill_iter(self, chunks, weights=None, chunksize=None, callback=None,
+                  threads=None):
+        """Fill histogram from an iterable of samples
+
+        Each item of ``chunks`` is a sample of data as accepted by
+        :py:meth:`Histogram.fill_from_sample` - a `(D, N)` block or a single
+        point. Only one chunk (or one buffer of ``chunksize`` entries) is held
+        in memory at any time so that generators over files or sockets can be
+        histogrammed without reading everything first.
+
+        Args:
+            chunks (iterable): Samples of data.
+            weights (number or iterable): A single weight for all entries or
+                an iterable yielding the weights of each chunk.
+            chunksize (int): If given, chunks are collected until there are
+                at least this many entries before filling. This is useful
+                when ``chunks`` yields single points.
+            callback (callable): Called as ``callback(nentries)`` with the
+                running total of entries after each fill.
+            threads (int): Passed on to :py:meth:`Histogram.fill_from_sample`.
+
+        Returns:
+            int: Total number of entries read from ``chunks``.
+
+        Example::
+
+            import numpy as np
+            from histogram import Histogram
+
+            def read_chunks(filepaths):
+                for filepath in filepaths:
+                    yield np.load(filepath)
+
+            h = Histogram(100, [0, 10], 100, [0, 10])
+            nentries = h.fill_iter(read_chunks(['a.npy', 'b.npy']))
+        """
+        nentries = 0
+        for sample, wt in self._rechunk(chunks, weights, chunksize):
+            self.fill_from_sample(sample, wt, threads)
+            nentries += sample.shape[1]
+            if callback is not None:
+                callback(nentries)
+        return nentries
+
+    def fill_from_dataset(self, dataset, columns=None, weights=None,
+                          weight_column=None, blocksize=None, callback=None,
+                          threads=None):
+        """Fill histogram from an on-disk table of data
+
+        The ``dataset`` is read in blocks of rows so memory use does not
+        depend on its size. It can be anything that supports ``shape`` and
+        slicing along the first index, typically a :py:class:`numpy.memmap`
+        (see :py:func:`numpy.load` with ``mmap_mode='r'``) or an
+        :py:class:`h5py.Dataset`. The rows are entries and the columns (or
+        fields for structured arrays) are the coordinates.
+
+        Args:
+            dataset (array-like): Table of shape `(N, C)` or `(N, )` with
+                a structured dtype. A plain `(N, )` array can be used to fill
+                a 1D histogram.
+            columns (list): Column indexes (or field names) to use for each
+                axis. Default is the first `D` columns (or fields).
+            weights (number or array-like): A single weight for all entries
+                or an array-like of length `N` which is read in blocks along
+                with ``dataset``.
+            weight_column (int or str): Column index (or field name) of the
+                ``dataset`` holding the weights.
+            blocksize (int): Number of rows read at a time. By default, this
+                is about ``rc.fill.chunksize`` rounded to a whole number of
+                HDF5 chunks if ``dataset`` is chunked.
+            callback (callable): Called as ``callback(nentries)`` with the
+                running total of entries after each block.
+            threads (int): Passed on to :py:meth:`Histogram.fill_from_sample`.
+
+        Returns:
+            int: Total number of entries read from ``dataset``.
+
+        Example::
+
+            import numpy as np
+            from histogram import Histogram
+
+            events = np.load('events.npy', mmap_mode='r')
+            h = Histogram(100, [0, 10], 100, [0, 10])
+            h.fill_from_dataset(events, columns=[2, 5], weight_column=7)
+        """
+        nrows = dataset.shape[0]
+        if blocksize is None:
+            blocksize = rc.fill.chunksize
+            chunks = getattr(dataset, 'chunks', None)
+            if chunks:
+                blocksize = max(1, blocksize // chunks[0]) * chunks[0]
+
+        names = dataset.dtype.names
+        if columns is None:
+            if names:
+                columns = names[:self.dim]
+            elif len(dataset.shape) > 1:
+                columns = list(range(self.dim))
+
+        def select(block, cols):
+            if names:
+                if isinstance(cols, string_types):
+                    return block[cols]
+                return [block[c] for c in cols]
+            elif cols is None:
+                return block
+            return block[:, cols].T
+
+        def blocks():
+            for start in range(0, nrows, blocksize):
+                yield dataset[start:start + blocksize]
+
+        def samples(blocks):
+            for block in blocks:
+                yield select(block, columns)
+
+        if weight_column is not None:
+            def wblocks(blocks):
+                for block in blocks:
+                    yield select(block, weight_column)
+            sample_blocks, weight_blocks = it.tee(blocks())
+            sample_blocks = samples(sample_blocks)
+            weights = wblocks(weight_blocks)
+        else:
+            sample_blocks = samples(blocks())
+            if weights is not None and isinstance(weights, Iterable):
+                wdataset = weights
+                weights = (wdataset[start:start + blocksize]
+                           for start in range(0, nrows, blocksize))
+
+        return self.fill_iter(sample_blocks, weights, callback=callback,
+                              threads=threads)
+
+    def _rechunk(self, chunks, weights=None, chunksize=None):
+        """Generator of `(sample, weights)` in blocks of at least `chunksize`.
+
+        The samples are `(D, N)` arrays. The weights are passed through
+        untouched when they are a single number.
         """
-        if not isinstance(sample, np.ndarray):
-            sample = np.array(sample)
-        wt = weights
-        if weights is not None:
-            if not isinstance(weights, Iterable):
-                wt = np.empty((sample.T.shape[0], ))
-                wt[...] = weights
-        h, e = np.histogramdd(sample.T, self.edges, weights=wt)
-        self.data += h.astype(self.data.dtype)
+        const_weight = weights is None or not isinstance(weights, Iterable)
+        if not const_weight:
+            weights = iter(weights)
+
+        samples, wts, n = [], [], 0
+        for chunk in chunks:
+            sample = _asample(chunk, self.dim)
+            if const_weight:
+                wt = weights
+            else:
+                try:
+                    wt = next(weights)
+                except StopIteration:
+                    raise ValueError('weights ran out before the sample.')
+            if chunksize is None:
+                yield sample, wt
+                continue
+            samples.append(sample)
+            if not const_weight:
+                wts.append(np.broadcast_to(wt, sample.shape[1:]))
+            n += sample.shape[1]
+            if n >= chunksize:
+                yield (np.concatenate(samples, axis=1),
+                       weights if const_weight else np.concatenate(wts))
+                samples, wts, n = [], [], 0
+        if samples:
+            yield (np.concatenate(samples, axis=1),
+                   weights if const_weight else np.concatenate(wts))
 
 ### operations
     def __deepcopy__(self, memo=None):
@@ -998,32 +2237,193 @@ class Histogram(object):
 
         newhist.axes = [deepcopy(ax) for ax in self.axes]
         if dtype is None:
-            newhist._data = deepcopy(self._data)
+            newhist._set_flow_data(deepcopy(self.flow_data))
         else:
-            newhist._data = self._data.astype(dtype)
+            newhist._set_flow_data(self.flow_data.astype(dtype))
         newhist.title = kwargs.get('title', deepcopy(self.title))
         newhist.label = kwargs.get('label', deepcopy(self.label))
-        if self.has_uncert:
+        if self.storage == 'weighted':
+            newhist._set_flow_variance(copy(self.flow_variance))
+        elif self.has_uncert:
             newhist._uncert = copy(self._uncert)
 
         return newhist
 
+    def _operands(self, that):
+        """Data of this histogram and of `that` for arithmetic.
+
+        Flow bins take part when `that` is a number or a histogram with the
+        same flow bins. Returns whether they do, this histogram's data and
+        the transposed nominal values and variance of `that`.
+        """
+        full = self.has_flow
+        if full:
+            if isinstance(that, Histogram):
+                full = that.flow_data.shape == self.flow_data.shape
+            else:
+                full = np.ndim(that) == 0
+        that_data, that_var = _nominal_and_variance(that, full)
+        data = self.flow_data if full else self.data
+        return full, data, that_data, that_var
+
+    def _operand_variance(self, full):
+        """Variance matching the data returned by `_operands`."""
+        return self.flow_variance if full else self.variance
+
+    def _set_operand_variance(self, var, full):
+        """Store variance matching the data returned by `_operands`."""
+        if not full:
+            self.variance = var
+        elif self.storage == 'weighted':
+            self.flow_variance[...] = var
+        else:
+            self.variance = var[self._inner]
+
+    @staticmethod
+    def merge(hists, threads=None, dtype=None):
+        """Sum of many histograms with identical axes.
+
+        This accumulates the data (and variance) of all histograms in
+        ``hists`` into preallocated arrays, avoiding the intermediate copies
+        and type checks of ``sum(hists)``. The histograms are consumed one
+        at a time so ``hists`` may be a generator which loads each from disk
+        when needed.
+
+        Args:
+            hists (iterable): Histograms to merge. They must have the same
+                axes, including flow bins, as the first one.
+
+        Keyword Args:
+            threads (int): Number of threads (default: ``rc.fill.threads``).
+                Each thread takes histograms from ``hists`` into its own
+                partial sum and the partial sums are then added pairwise.
+            dtype (scalar type): Type of the merged data. (default: that of
+                the first histogram, promoted as for addition if another
+                histogram needs it)
+
+        Returns:
+            Histogram: The sum, with the labels and storage of the first
+            histogram. The variance is propagated as for addition.
+
+        Example::
+
+            from histogram import Histogram, load_histograms
+
+            def partials(filenames):
+                for filename in filenames:
+                    yield load_histograms(filename)['h']
+
+            h = Histogram.merge(partials(filenames), threads=4)
+        """
+        if threads is None:
+            threads = rc.fill.threads
+        hists = iter(hists)
+        try:
+            first = next(hists)
+        except StopIteration:
+            raise ValueError('no histograms to merge.')
+        promote = dtype is None
+        if dtype is None:
+            dtype = first.data.dtype
+        shape = first.flow_data.shape
+        weighted = first.storage == 'weighted'
+
+        def check(h):
+            if h.flow_data.shape != shape:
+                raise ValueError('histogram axes must match.')
+            if __debug__:
+                # bytes comparison is much faster than HistogramAxis.__eq__
+                for a, aa in zip(first.axes, h.axes):
+                    if not (a.edges is aa.edges or
+                            a.edges.tobytes() == aa.edges.tobytes() or
+                            a == aa):
+                        raise ValueError('histogram axes must match.')
+
+        def add(a, b):
+            """Sum of `a` and `b`, in-place unless the type of `a` must be
+            promoted."""
+            if np.can_cast(b.dtype, a.dtype):
+                a += b
+            elif promote:
+                a = a + b
+            else:
+                np.add(a, b, out=a, casting='unsafe')
+            return a
+
+        def accumulate(items):
+            """Partial sums of data, variance and data of the histograms
+            which contributed to the variance."""
+            data = np.zeros(shape, dtype=dtype)
+            var, vdata = None, None
+            for h in items:
+                check(h)
+                data = add(data, h.flow_data)
+                if weighted or h.has_uncert:
+                    if var is None:
+                        var = np.zeros(shape, dtype=np.float64)
+                        vdata = np.zeros(shape, dtype=dtype)
+                    var += h.flow_variance
+                    vdata = add(vdata, h.flow_data)
+            return [data, var, vdata]
+
+        def combine(pair):
+            a, b = pair
+            for i in range(3):
+                if a[i] is None:
+                    a[i] = b[i]
+                elif b[i] is not None:
+                    a[i] = add(a[i], b[i])
+            return a
+
+        items = it.chain([first], hists)
+        if threads > 1:
+            lock = Lock()
+
+            def take():
+                while True:
+                    with lock:
+                        h = next(items, None)
+                    if h is None:
+                        return
+                    yield h
+
+            pool = ThreadPool(threads)
+            try:
+                partials = pool.map(lambda _: accumulate(take()),
+                                    range(threads))
+                while len(partials) > 1:
+                    pairs = list(zip(partials[::2], partials[1::2]))
+                    rest = partials[2 * len(pairs):]
+                    partials = pool.map(combine, pairs) + rest
+            finally:
+                pool.close()
+            data, var, vdata = partials[0]
+        else:
+            data, var, vdata = accumulate(items)
+
+        ret = first.copy(data.dtype)
+        ret.flow_data[...] = data
+        if weighted:
+            ret.flow_variance[...] = var
+        elif var is not None:
+            # Poisson statistics for those without uncertainty
+            var += data - vdata
+            ret.uncert = np.sqrt(var[ret._inner])
+        return ret
+
     def __iadd__(self, that):
         """In-place addition."""
-        if isinstance(that, Histogram):
-            if self.has_uncert or that.has_uncert:
-                self_data = unp.uarray(self.data, self.uncert)
-                that_data = unp.uarray(that.data, that.uncert)
-                self_data.T[...] += that_data.T
-                self.data[...] = unp.nominal_values(self_data)
-                self.uncert = unp.std_devs(self_data)
-            else:
-                self.data.T[...] += that.data.T
+        that = _dense(that)
+        full, data, that_data, that_var = self._operands(that)
+        if isinstance(that, Histogram) and not (self.has_uncert or
+                                                that.has_uncert):
+            data.T[...] += that_data
         else:
-            self_data = unp.uarray(self.data, self.uncert)
-            self_data.T[...] += np.asarray(that).T
-            self.data[...] = unp.nominal_values(self_data)
-            self.uncert = unp.std_devs(self_data)
+            var = self._operand_variance(full).T
+            if that_var is not None:
+                var = var + that_var
+            data.T[...] = data.T + that_data
+            self._set_operand_variance(var.T, full)
         return self
 
     def __radd__(self, that):
@@ -1032,6 +2432,7 @@ class Histogram(object):
 
     def __add__(self, that):
         """Addition."""
+        that = _dense(that)
         if isinstance(that, Histogram) and self.dim < that.dim:
             return that + self
         else:
@@ -1056,25 +2457,25 @@ class Histogram(object):
 
     def __isub__(self, that):
         """In-place subtraction."""
-        if isinstance(that, Histogram):
-            self_data = unp.uarray(self.data, self.uncert)
-            that_data = unp.uarray(that.data, that.uncert)
-            self_data.T[...] -= that_data.T
-            self.data[...] = unp.nominal_values(self_data)
-            self.uncert = unp.std_devs(self_data)
-        else:
-            self_data = unp.uarray(self.data, self.uncert)
-            self_data.T[...] -= np.asarray(that).T
-            self.data[...] = unp.nominal_values(self_data)
-            self.uncert = unp.std_devs(self_data)
+        that = _dense(that)
+        full, data, that_data, that_var = self._operands(that)
+        var = self._operand_variance(full).T
+        if that_var is not None:
+            var = var + that_var
+        data.T[...] = data.T - that_data
+        self._set_operand_variance(var.T, full)
         return self
 
     def __rsub__(self, that):
         """Commuting subtraction."""
+        that = _dense(that)
         ret = self.copy(np.float64, label=None)
-        ret.data.T[...] = unp.nominal_values(that).T
-        ret._uncert = np.empty(shape=ret.data.shape)
-        ret._uncert.T[...] = unp.std_devs(that).T
+        full, data, that_data, that_var = ret._operands(that)
+        data.T[...] = that_data
+        var = np.zeros(shape=data.shape)
+        if that_var is not None:
+            var.T[...] = that_var
+        ret._set_operand_variance(var, full)
         ret -= self
         return ret
 
@@ -1086,17 +2487,15 @@ class Histogram(object):
 
     def __imul__(self, that):
         """In-place multiplication."""
-        if isinstance(that, Histogram):
-            self_data = unp.uarray(self.data, self.uncert)
-            that_data = unp.uarray(that.data, that.uncert)
-            self_data.T[...] *= that_data.T
-            self.data[...] = unp.nominal_values(self_data)
-            self.uncert = unp.std_devs(self_data)
-        else:
-            self_data = unp.uarray(self.data, self.uncert)
-            self_data.T[...] *= np.asarray(that).T
-            self.data[...] = unp.nominal_values(self_data)
-            self.uncert = unp.std_devs(self_data)
+        that = _dense(that)
+        full, data, that_data, that_var = self._operands(that)
+        self_data = data.T
+        var = (np.square(that_data, dtype=np.float64) *
+               self._operand_variance(full).T)
+        if that_var is not None:
+            var += np.square(self_data, dtype=np.float64) * that_var
+        data.T[...] = self_data * that_data
+        self._set_operand_variance(var.T, full)
         return self
 
     def __rmul__(self, that):
@@ -1111,25 +2510,35 @@ class Histogram(object):
 
     def __itruediv__(self, that):
         """In-place (true) division."""
+        that = _dense(that)
+        full, data, that_data, that_var = self._operands(that)
         if isinstance(that, Histogram):
-            infs = np.isclose(that.data, 0)
-            nans = np.isclose(self.data, 0) & infs
-            ninfs = (self.data < 0) & infs
+            that_data, that_var = that_data.T, that_var.T
+            infs = np.isclose(that_data, 0)
+            nans = np.isclose(data, 0) & infs
+            ninfs = (data < 0) & infs
             sel = ~(infs | nans)
-            self_data = unp.uarray(self.data[sel], self.uncert[sel])
-            that_data = unp.uarray(that.data[sel], that.uncert[sel])
-            self_data.T[...] /= that_data.T
-            self.data[sel] = unp.nominal_values(self_data)
-            self.uncert[sel] = unp.std_devs(self_data)
-            self.data[infs] = np.inf
-            self.data[ninfs] = -np.inf
-            self.data[nans] = np.nan
-            self.uncert[infs | nans] = np.nan
+            self_data = data[sel]
+            that_data = that_data[sel]
+            that_data2 = np.square(that_data, dtype=np.float64)
+            var = np.array(self._operand_variance(full), dtype=np.float64)
+            var[sel] = (var[sel] + np.square(self_data, dtype=np.float64) *
+                        that_var[sel] / that_data2) / that_data2
+            data[sel] = self_data / that_data
+            data[infs] = np.inf
+            data[ninfs] = -np.inf
+            data[nans] = np.nan
+            var[infs | nans] = np.nan
+            self._set_operand_variance(var, full)
         else:
-            self_data = unp.uarray(self.data, self.uncert)
-            self_data.T[...] /= np.asarray(that).T
-            self.data[...] = unp.nominal_values(self_data)
-            self.uncert = unp.std_devs(self_data)
+            self_data = data.T
+            that_data2 = np.square(that_data, dtype=np.float64)
+            var = self._operand_variance(full).T / that_data2
+            if that_var is not None:
+                var += (np.square(self_data, dtype=np.float64) * that_var /
+                        np.square(that_data2))
+            data.T[...] = self_data / that_data
+            self._set_operand_variance(var.T, full)
         return self
 
     def __rtruediv__(self, that):
@@ -1138,10 +2547,14 @@ class Histogram(object):
             that = 1.
             hret = that / hself
         """
+        that = _dense(that)
         ret = self.copy(np.float64, label=None)
-        ret.data.T[...] = unp.nominal_values(that).T
-        ret._uncert = np.empty(shape=ret.data.shape)
-        ret._uncert.T[...] = unp.std_devs(that).T
+        full, data, that_data, that_var = ret._operands(that)
+        data.T[...] = that_data
+        var = np.zeros(shape=data.shape)
+        if that_var is not None:
+            var.T[...] = that_var
+        ret._set_operand_variance(var, full)
         ret /= self
         return ret
 
@@ -1183,7 +2596,7 @@ class Histogram(object):
                     **kwargs).reshape(self.shape)
                 if self.has_uncert:
                     values = self.uncert.ravel()
-                    self.uncert[...] = interpolate.griddata(
+                    self.uncert = interpolate.griddata(
                         points[finite],
                         values[finite],
                         points,
@@ -1212,7 +2625,7 @@ class Histogram(object):
         """
         self.interpolate_nonfinites()
         if issubclass(self.data.dtype.type, Integral):
-            self._data = self.data.astype(np.float64)
+            self._set_flow_data(self.flow_data.astype(np.float64))
         Zf = ndimage.filters.gaussian_filter(self.data, sigma=sigma, mode=mode,
                                              **kwargs)
         self.data   = weight * Zf + (1. - weight) * self.data
@@ -1232,16 +2645,25 @@ class Histogram(object):
         return np.rollaxis(uncert, axis)
 
     def slices(self, axis=0):
-        """Generator of histograms along specified axis."""
-        if self.has_uncert:
+        """Generator of histograms along specified axis.
+
+        The flow bins of the other axes are kept in each slice.
+        """
+        inner = self._inner[axis]
+        nslices = self.axes[axis].nbins
+        uncert_slices = [None] * nslices
+        variance_slices = [None] * nslices
+        if self.storage == 'weighted':
+            variance_slices = np.rollaxis(self.flow_variance, axis)[inner]
+        elif self.has_uncert:
             uncert_slices = self.slices_uncert(axis)
-        else:
-            uncert_slices = [None]*self.axes[axis].nbins
-        for d, u in zip(self.slices_data(axis), uncert_slices):
+        data_slices = np.rollaxis(self.flow_data, axis)[inner]
+        for d, u, v in zip(data_slices, uncert_slices, variance_slices):
             yield Histogram(
                 *[a for i, a in enumerate(self.axes) if i != axis],
                 data=d,
                 uncert=u,
+                variance=v,
                 title=self.title,
                 label=self.label)
 
@@ -1256,44 +2678,50 @@ class Histogram(object):
             clip (bool): Wether or not to include the non-uniform bin in the
                 case that `bins` does not evenly divide the number of bins in
                 this `axis`.
+
+        If this `axis` has flow bins, the bins clipped off are added to the
+        underflow or overflow bin.
         """
         axnew = [ax.mergebins(nbins, snap, clip) if i == axis else ax
                  for i, ax in enumerate(self.axes)]
-
-        if self.has_uncert:
-            x = unp.uarray(self.data.astype(np.float64), copy(self.uncert))
-        else:
-            x = self.data.copy()
-
-        x = np.rollaxis(x, axis, 0)
-        a = x.shape[0]
-        d, r = divmod(a, nbins)
-        shp = [d, nbins]
-        if len(x.shape) > 1:
-            shp += list(x.shape[1:])
-        if r == 0:
-            x = x.reshape(shp)
-        else:
-            if not clip:
-                shp[0] = shp[0] + r
-                zeros = np.zeros([nbins - r] + list(x.shape[1:]))
+        ax = self.axes[axis]
+        d, r = divmod(ax.nbins, nbins)
+        lo, hi = (0, d * nbins) if snap == 'low' else (r, ax.nbins)
+
+        def merge(x):
+            x = np.rollaxis(x, axis, 0)
+            if ax.flow:
+                if clip:
+                    x = _fold_flow(x, lo, hi)
+                under, x, over = x[:1], x[1:-1], x[-1:]
+            elif clip:
+                x = x[lo:hi]
+            if r != 0 and not clip:
+                zeros = np.zeros((nbins - r,) + x.shape[1:], dtype=x.dtype)
                 if snap == 'low':
                     x = np.concatenate((x, zeros))
                 else:
                     x = np.concatenate((zeros, x))
-            x = np.resize(x, shp)
-        x = x.sum(1)
-        x = np.rollaxis(x, 0, axis + 1)
+            x = x.reshape((-1, nbins) + x.shape[1:]).sum(1)
+            if ax.flow:
+                x = np.concatenate((under, x, over))
+            return np.rollaxis(x, 0, axis + 1)
 
+        # variances of the merged bins add
         if self.has_uncert:
-            data = unp.nominal_values(x)
-            uncert = unp.std_devs(x)
+            data = merge(self.flow_data.astype(np.float64))
+            variance = merge(self.flow_variance)
         else:
-            data = x
-            uncert = None
-
-        return Histogram(*axnew, title=self.title, label=self.label,
-                         data=data, uncert=uncert)
+            data = merge(self.flow_data.copy())
+            variance = None
+
+        if self.storage == 'weighted':
+            return Histogram(*axnew, title=self.title, label=self.label,
+                             data=data, variance=variance)
+        ret = Histogram(*axnew, title=self.title, label=self.label, data=data)
+        if variance is not None:
+            ret.uncert = np.sqrt(variance[ret._inner])
+        return ret
 
     def cut(self, *args, **kwargs):
         """Truncate a histogram along one or more axes.
@@ -1337,48 +2765,45 @@ class Histogram(object):
         the form::
 
             [xmin, xmax, ymin, ymax]
+
+        Along axes with flow bins, the bins cut away are added to the
+        underflow and overflow bins.
         """
-        axis = kwargs.pop('axis', None)
-        rng = []
-        for a in args:
-            if isinstance(a, Iterable):
-                rng += a
-                if len(a)== 1:
-                    rng += [None]
-            else:
-                rng += [a]
-        if (len(rng) % 2) == 1:
-            rng.append(None)
-        rng = np.asarray(rng)
-        rng.shape = (-1, 2)
+        rng = _cut_ranges(args, self.dim, kwargs.pop('axis', None))
 
-        if axis is not None:
-            inrng = copy(rng)
-            rng = [[None, None] for _ in range(self.dim)]
-            rng[axis] = inrng[0]
-            rng = np.asarray(rng)
+        def take(x, indices, i, flow):
+            if not flow:
+                return x.take(indices, i)
+            x = _fold_flow(np.rollaxis(x, i), indices[0], indices[-1] + 1)
+            return np.rollaxis(x, 0, i + 1)
 
         newaxes = []
-        newdata = copy(self.data)
-        if self.has_uncert:
+        newdata = copy(self.flow_data)
+        newuncert = None
+        newvariance = None
+        if self.storage == 'weighted':
+            newvariance = self.flow_variance
+        elif self.has_uncert:
             newuncert = copy(self.uncert)
-        else:
-            newuncert = None
-        for i, (r, ax) in enumerate(zip(rng, self.axes)):
-            xlow, xhigh = r
+        for i, ax in enumerate(self.axes):
+            # axes without a given range are not cut
+            xlow, xhigh = rng[i] if i < len(rng) else (None, None)
             if (xlow is None) and (xhigh is None):
                 newaxes += [ax.copy()]
             else:
                 a, m = ax.cut(xlow, xhigh, ('nearest', 'nearest'))
                 indices = np.argwhere(m)[:, 0]
                 newaxes += [a]
-                newdata = newdata.take(indices, i)
+                newdata = take(newdata, indices, i, ax.flow)
                 if newuncert is not None:
                     newuncert = newuncert.take(indices, i)
+                if newvariance is not None:
+                    newvariance = take(newvariance, indices, i, ax.flow)
 
         return Histogram(*newaxes,
             data = newdata,
             uncert = newuncert,
+            variance = newvariance,
             title = kwargs.get('title', copy(self.title)),
             label = kwargs.get('label', copy(self.label)))
 
@@ -1403,6 +2828,42 @@ class Histogram(object):
         Fits the function ``fcn`` to the histogram, returning estimated
         parameters, their covariance matrix and a tuple containing the
         specified test result (chi-square test is default).
+
+        Keyword Args:
+            test (str): Goodness of fit test: ``'chisquare'``, ``'kstest'``,
+                ``'shapiro'`` or ``'none'``.
+            uncert (array): Uncertainty of the data. (default:
+                :py:attr:`Histogram.uncert`)
+            sel (array): Selection of bins to fit.
+            likelihood (str): If ``'poisson'``, the data are taken as counts
+                and the binned Poisson likelihood is maximized with
+                :py:func:`scipy.optimize.minimize` instead of a least-squares
+                fit with :py:func:`scipy.optimize.curve_fit`. This is not
+                biased for low counts and includes empty bins. The
+                covariance is the inverse of the Fisher information and the
+                chi-square test uses the likelihood ratio to the data.
+            jac (callable): Jacobian ``jac(x, *p)`` of ``fcn`` with respect to
+                the parameters, an array of shape `(N, P)` for the `N` points
+                `x`. (default: forward differences)
+            **kwargs: Passed directly to :py:func:`scipy.optimize.curve_fit`
+                or, for likelihood fits, :py:func:`scipy.optimize.minimize`.
+
+        The values of ``fcn`` at the parameters found are those of the last
+        evaluations of the fit and are not computed again for the test.
+
+        Example::
+
+            def expo(x, n, k):
+                return n * np.exp(-k * x)
+
+            def expo_jac(x, n, k):
+                e = np.exp(-k * x)
+                return np.stack([e, -n * x * e], axis=-1)
+
+            h = Histogram(20, [0, 4])
+            h.fill(np.random.exponential(1, 60))
+            popt, pcov, ptest = h.fit(expo, [10, 1], jac=expo_jac,
+                                      likelihood='poisson')
         """
 
         test = str(kwargs.pop('test', 'chisquare')).lower()
@@ -1416,78 +2877,103 @@ class Histogram(object):
 
         # initial parameters
         if hasattr(p0, '__call__'):
-            kwargs['p0'] = p0(self)
+            p0 = p0(self)
         else:
-            kwargs['p0'] = copy(p0)
+            p0 = copy(p0)
 
-        npar = len(kwargs['p0'])
+        xx = self.grid()
+        sel = sel & np.all([np.isfinite(x) for x in xx], axis=0)
+        return _curve_fit(fcn, xx, self.data, uncert, sel, p0, test, **kwargs)
 
-        # data selection
-        sel &= np.isfinite(self.data)
+    def fit_slices(self, fcn, p0, axis=0, **kwargs):
+        """Fit a function to each slice of the histogram along an axis
 
-        xx = self.grid()
-        for x in xx:
-            sel &= np.isfinite(x)
+        Fits ``fcn`` to every histogram given by
+        :py:meth:`Histogram.slices` as :py:meth:`Histogram.fit` would, but
+        the grid and its selection are computed once for all slices and
+        each fit starts from the parameters found for the previous slice.
+        The slices are split into consecutive blocks, one for each worker,
+        which are fitted in parallel.
 
-        if uncert is not None:
-            # consider only finite uncertainties
-            sel &= np.isfinite(uncert)
-            if np.allclose(uncert[0], uncert):
-                # uncertainties are the same value
-                uncert = None
-            else:
-                # throw out uncertainties equal to zero
-                sel &= ~ np.isclose(uncert, 0)
+        Args:
+            fcn (callable): Function of the grid (see :py:meth:`Histogram.fit`)
+                and the parameters.
+            p0 (sequence or callable): Initial parameters, or a function of
+                the slice returning them. This is used for the first slice of
+                each block and after a failed fit.
+            axis (int): Axis along which to slice this histogram.
 
-        if np.count_nonzero(sel) < npar:
-            raise ValueError('Not enough data.')
+        Keyword Args:
+            workers (int): Number of blocks of slices fitted in parallel.
+                (default: 1)
+            processes (bool): Use a pool of processes instead of threads. In
+                this case, ``fcn`` and ``p0`` must be picklable, i.e. defined
+                at module level. (default: False)
+            test (str): Goodness of fit test as for :py:meth:`Histogram.fit`.
+            uncert (array): Uncertainty of the data with the shape of this
+                histogram. (default: :py:attr:`Histogram.uncert`)
+            sel (array): Selection of bins with the shape of this histogram.
+            **kwargs: Passed on as for :py:meth:`Histogram.fit`, for example
+                ``likelihood`` and ``jac``.
 
-        # make selection on grid
-        xx = np.squeeze(tuple(x[sel].astype(np.float64) for x in xx))
+        Returns:
+            tuple: Arrays of the parameters `(S, P)`, their covariance
+            matrices `(S, P, P)` and, unless ``test='none'``, the test results
+            `(S, 2)` of each of the `S` slices. These are NaN for slices
+            which could not be fitted.
 
-        # make selection on data at grid points
-        yy = self.data[sel].astype(np.float64)
+        Example::
 
-        # make selection on uncertainty
-        if uncert is not None:
-            kwargs['sigma'] = uncert[sel].astype(np.float64)
-            kwargs['absolute_sigma'] = True
+            h = Histogram(20, [0, 10], 50, [-5, 5])
+            h.fill(np.random.uniform(0, 10, 10**6),
+                   np.random.normal(0, 1, 10**6))
+            gauss = lambda x, n, m, s: n * stats.norm(m, s).pdf(x)
+            pfit, pcov, ptest = h.fit_slices(gauss, [1000, 0, 1], workers=4)
+            means = pfit[:, 1]
+        """
+        workers = kwargs.pop('workers', None) or 1
+        processes = kwargs.pop('processes', False)
+        test = str(kwargs.pop('test', 'chisquare')).lower()
+        uncert = kwargs.pop('uncert', self.uncert)
+        sel = kwargs.pop('sel', np.ones(self.shape, dtype=bool))
 
-        # perform the fit
-        pfit, pcov = opt.curve_fit(fcn, xx, yy, **kwargs)
+        if 'sigma' in kwargs:
+            raise ValueError('"sigma" keyword not valid, use "uncert".')
+        if 'absolute_sigma' in kwargs:
+            raise ValueError('"absolute_sigma" ignored (considered True).')
 
-        if not isinstance(pcov, np.ndarray) or np.isinf(pcov).any():
-            raise RuntimeError('Bad fit.')
+        axes = [ax for i, ax in enumerate(self.axes) if i != axis]
+        xx = np.meshgrid(*[ax.bincenters() for ax in axes], indexing='ij')
+        gridsel = np.all([np.isfinite(x) for x in xx], axis=0)
 
-        ### perform goodness of fit test
-        if test != 'none':
+        nslices = self.axes[axis].nbins
+        uncert_slices = [None] * nslices
+        if uncert is not None:
+            uncert_slices = np.rollaxis(np.asarray(uncert), axis)
+        slices = list(zip(np.rollaxis(self.data, axis), uncert_slices,
+                          np.rollaxis(np.asarray(sel), axis)))
+
+        blocks = [(fcn, p0, axes, xx, gridsel, slices[b[0]:b[-1] + 1],
+                   test, kwargs)
+                  for b in np.array_split(np.arange(nslices), workers)
+                  if len(b)]
+        if len(blocks) > 1:
+            pool = (Pool if processes else ThreadPool)(len(blocks))
             try:
-                N = len(xx)
-            except:
-                N = 1
-            m = npar
-            ndf = N - m
-            yyfit = fcn(xx, *pfit)
-            dyy = yy - yyfit
-
-            # nchar is the minimum number of characters
-            # used to disambiguate goodness of fit tests.
-            # at the moment, one letter is sufficient.
-            nchar = 1
-            if test[:nchar] == 'kstest'[:nchar]:
-                # two-sided Kolmogorov-Smirov test
-                D, pval = stats.kstest(dyy,
-                            stats.norm(0, dyy.std()).cdf)
-                ptest = (D, pval)
-            elif test[:nchar] == 'shapiro'[:nchar]:
-                # Shapiro-Wilk test
-                W, pval = stats.shapiro(dyy)
-                ptest = (W, pval)
-            else: # test[:nchar] == 'chisquare'[:nchar]:
-                # simple Chi-squared test
-                chisq, pval = stats.chisquare(yy, yyfit, len(pfit))
-                ptest = (chisq/ndf, pval)
-
-            return pfit, pcov, ptest
-
-        return pfit, pcov
+                results = pool.map(_fit_slices, blocks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [_fit_slices(b) for b in blocks]
+        results = list(it.chain(*results))
+
+        good = [r for r in results if r is not None]
+        if not good:
+            raise RuntimeError('no slice could be fitted.')
+        ret = [np.full((nslices,) + np.shape(a), np.nan) for a in good[0]]
+        for i, r in enumerate(results):
+            if r is not None:
+                for a, v in zip(ret, r):
+                    a[i] = v
+        return tuple(ret)
@@ -1,11 +1,31 @@
-from __future__ import unicode_literals
+from __future__ import division, unicode_literals
 from builtins import str
-from six import string_types, text_type
+from six import integer_types, string_types, text_type
 
 from copy import copy, deepcopy
 from collections import Iterable, namedtuple
+from itertools import repeat
+import weakref
 import numpy as np
 
+# types of single values taken by the scalar paths of bin()
+_SCALAR_TYPES = (float, np.number) + integer_types
+
+# read-only edge arrays shared between axes (see _intern_edges)
+_interned_edges = weakref.WeakValueDictionary()
+
+def _intern_edges(e):
+    """Read-only copy of the edges `e`, shared by all axes with edges of
+    the same dtype and values for as long as any of them exists."""
+    key = (e.dtype.str, len(e), hash(e.tobytes()))
+    shared = _interned_edges.get(key)
+    if shared is not None and np.array_equal(shared, e):
+        return shared
+    e = np.array(e)
+    e.flags.writeable = False
+    _interned_edges[key] = e
+    return e
+
 class HistogramAxis(object):
     r"""A single axis used internally by :class:`Histogram` to store
     the bin edges in an open-grid format.
@@ -21,6 +41,9 @@ class HistogramAxis(object):
         limits (float 2-tuple): `(min,max)` representing the limits of
         this axis used in combination with integer `bins`.
         label (str): The axis label including units if applicable.
+        flow (bool): Keep underflow and overflow bins along this axis when
+        used in a :class:`Histogram`. Entries below the lowest edge (or
+        above the highest edge) are counted there instead of being dropped.
 
     Raises:
         TypeError:  If `bins` is a list and `limits` is not None.
@@ -41,7 +64,7 @@ class HistogramAxis(object):
             a3 = HistogramAxis(np.logspace(0,4,11))
 
     """
-    def __init__(self, bins, limits=None, label=None):
+    def __init__(self, bins, limits=None, label=None, flow=False):
         # allow second argument to be the label if it is a string,
         # bins is iterable and no other argument is used
         if (isinstance(bins, Iterable) and
@@ -69,6 +92,7 @@ class HistogramAxis(object):
 
         if label is not None:
             self.label = label
+        self.flow = flow
 
     def __str__(self):
         """String representation the edges array.
@@ -80,13 +104,14 @@ class HistogramAxis(object):
 
     def __repr__(self):
         """Complete string representation of the histogram axis."""
-        fmt = 'HistogramAxis(bins={}{})'
+        fmt = 'HistogramAxis(bins={}{}{})'
         if self.label is None:
             lbl = ''
         else:
             x = '{}'.format(self.label)
             lbl = ', label="{}"'.format(self.label)
-        return fmt.format(repr(self.edges.tolist()), lbl)
+        flow = ', flow=True' if self.flow else ''
+        return fmt.format(repr(self.edges.tolist()), lbl, flow)
 
     def __eq__(self, that):
         r"""Compare edges to within numpy's default tolerance.
@@ -103,7 +128,10 @@ class HistogramAxis(object):
             \mathtt{that.edges[i]}`.
         """
         try:
-            return np.allclose(self.edges,that.edges)
+            e, ee = self.edges, that.edges
+            if e is ee:
+                return True
+            return np.allclose(e, ee)
         except ValueError:
             return False
 
@@ -113,11 +141,24 @@ class HistogramAxis(object):
             return False
         if self.label != that.label:
             return False
+        if self.flow != that.flow:
+            return False
+        if self.growth != that.growth:
+            return False
         return True
 
     @property
     def edges(self):
-        """The list of bin edges from low to high."""
+        """The list of bin edges from low to high.
+
+        This is a read-only array shared with all other axes that have
+        identical edges. Setting it replaces the edges of this axis only.
+
+        Note:
+            The edges can no longer be modified in-place as in
+            ``ax.edges *= 2``. Assign new edges instead:
+            ``ax.edges = ax.edges * 2``.
+        """
         return self._edges
 
     @edges.setter
@@ -129,9 +170,22 @@ class HistogramAxis(object):
                 raise ValueError('edges must have two or more values')
             if e.ndim != 1:
                 raise ValueError('edges must be a one-dimensional array')
-            if not all(x < y for x, y in zip(e, e[1:])):
+            if not np.all(e[1:] > e[:-1]):
                 raise ValueError('edges must be strictly increasing')
-        self._edges = e
+        self._edges = _intern_edges(e)
+        self._arithmetic = None
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        """Value of ``compute()`` stored under `key` until the edges are
+        set again. Arrays are made read-only since they are shared."""
+        cache = self.__dict__.setdefault('_cache', {})
+        if key not in cache:
+            value = compute()
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            cache[key] = value
+        return cache[key]
 
     @property
     def label(self):
@@ -147,6 +201,22 @@ class HistogramAxis(object):
     def label(self):
         del self._label
 
+    @property
+    def flow(self):
+        """True if a histogram keeps underflow and overflow bins along
+        this axis."""
+        return getattr(self, '_flow', False)
+
+    @flow.setter
+    def flow(self, f):
+        self._flow = bool(f)
+
+    @property
+    def growth(self):
+        """True if a histogram extends this axis to include entries
+        outside of it (see :class:`UniformAxis`)."""
+        return getattr(self, '_growth', False)
+
     def asdict(self, encoding=None):
         ret = {'edges':self.edges}
         if self.label is not None:
@@ -154,6 +224,10 @@ class HistogramAxis(object):
                 ret['label'] = self.label.encode(encoding)
             else:
                 ret['label'] = self.label
+        if self.flow:
+            ret['flow'] = True
+        if self.growth:
+            ret['growth'] = True
         return ret
 
     @staticmethod
@@ -162,7 +236,30 @@ class HistogramAxis(object):
         if encoding is not None:
             if label is not None:
                 label = label.decode(encoding)
-        return HistogramAxis(bins=d['edges'], label=label)
+        flow = bool(d.get('flow', False))
+        transform = d.get('transform', None)
+        if transform is not None:
+            if encoding is not None:
+                transform = transform.decode(encoding)
+            edges = np.asarray(d['edges'])
+            return TransformedAxis(len(edges) - 1, edges[[0, -1]],
+                                   text_type(transform), label=label,
+                                   flow=flow)
+        if 'categories' in d:
+            categories = np.asarray(d['categories'])
+            if encoding is not None and categories.dtype.kind == 'S':
+                categories = np.char.decode(categories, encoding)
+            return CategoryAxis(categories, label=label, flow=flow)
+        if d.get('integer', False):
+            edges = np.asarray(d['edges'])
+            return IntegerAxis(int(round(edges[0] + 0.5)),
+                               int(round(edges[-1] + 0.5)), label=label,
+                               flow=flow)
+        if d.get('growth', False):
+            edges = np.asarray(d['edges'])
+            return UniformAxis(len(edges) - 1, edges[[0, -1]], label=label,
+                               growth=True)
+        return HistogramAxis(bins=d['edges'], label=label, flow=flow)
 
     @property
     def nbins(self):
@@ -195,12 +292,15 @@ class HistogramAxis(object):
         return self.max - self.min
 
     def binwidths(self):
-        """All bin widths as an array."""
-        return self.edges[1:] - self.edges[:-1]
+        """All bin widths as a new array (copied from a cached one)."""
+        return self._cached(
+            'binwidths', lambda: self.edges[1:] - self.edges[:-1]).copy()
 
     def bincenters(self):
-        """Centers of all bins as an array."""
-        return 0.5 * (self.edges[:-1] + self.edges[1:])
+        """Centers of all bins as a new array (copied from a cached one)."""
+        return self._cached(
+            'bincenters',
+            lambda: 0.5 * (self.edges[:-1] + self.edges[1:])).copy()
 
     @property
     def overflow_value(self):
@@ -212,8 +312,14 @@ class HistogramAxis(object):
         cls = self.__class__
         newaxis = cls.__new__(cls)
         memo[id(self)] = newaxis
-        newaxis._edges = deepcopy(self.edges, memo)
+        if self.edges.flags.writeable:
+            newaxis._edges = deepcopy(self.edges, memo)
+        else:
+            newaxis._edges = self.edges
         newaxis._label = deepcopy(self.label, memo)
+        newaxis._flow = self.flow
+        # cached arrays are read-only and can be shared
+        newaxis._cache = dict(getattr(self, '_cache', {}))
         return newaxis
 
     def __copy__(self):
@@ -248,10 +354,54 @@ class HistogramAxis(object):
             int or array of ints: Bin(s) corresponding to the value `x`.
 
         Notes:
-            This follows the convention: low <= x < high.
+            This follows the convention: low <= x < high. Values below
+            the axis give -1 and values above it (or ``nan``) give
+            :py:attr:`HistogramAxis.nbins`.
+
+            Arrays are binned arithmetically when the edges are uniform
+            (see :py:meth:`HistogramAxis._arithmetic_binning`) and with
+            :py:func:`numpy.searchsorted` otherwise.
         """
+        if np.ndim(x) > 0 and self._arithmetic_binning():
+            return self._bin_arithmetic(np.asarray(x))
         return np.searchsorted(self.edges, x, side='right') - 1
 
+    def _arithmetic_binning(self):
+        """Check (once) if bins can be found by multiply and floor.
+
+        This is the case when every edge lies within a quarter of a bin
+        width from its ideal uniform position so that the arithmetic
+        estimate of the bin is never off by more than one. The result
+        is cached until the edges are changed.
+        """
+        arithmetic = getattr(self, '_arithmetic', None)
+        if arithmetic is None:
+            e = self.edges
+            n = len(e) - 1
+            w = (e[-1] - e[0]) / n
+            uniform = np.linspace(e[0], e[-1], n + 1)
+            arithmetic = bool(np.all(np.abs(e - uniform) <= 0.25 * w))
+            # nan padding so that the round-off correction in
+            # _bin_arithmetic() never moves a bin beyond [-1, nbins]
+            self._padded_edges = np.concatenate(
+                ([np.nan], e.astype(np.float64), [np.nan]))
+            self._arithmetic = arithmetic
+        return arithmetic
+
+    def _bin_arithmetic(self, x):
+        """Bin index of each value in the array `x` for uniform edges."""
+        e = self._padded_edges
+        n = self.nbins
+        b = (x - self.min) * (n / self.range)
+        # fmin() sends nan to the overflow bin
+        b = np.fmin(b, n, out=b)
+        b = np.fmax(b, -1, out=b)
+        b = np.floor(b, out=b).astype(np.intp)
+        # correct for round-off against the actual edges
+        b -= x < e[b + 1]
+        b += x >= e[b + 2]
+        return b
+
     def edge_index(self, x, snap='nearest'):
         """Index of the edge based on the given snap.
 
@@ -337,9 +487,11 @@ class HistogramAxis(object):
             bin widths, :math:`w_{i}`.
 
         """
-        widths = self.binwidths()
-        median = np.median(widths)
-        return np.allclose(widths, median, rtol=rtol, atol=atol)
+        def isuniform():
+            widths = self.binwidths()
+            median = np.median(widths)
+            return np.allclose(widths, median, rtol=rtol, atol=atol)
+        return self._cached(('isuniform', rtol, atol), isuniform)
 
     _CutResult = namedtuple('CutResult', ['axis', 'mask'])
 
@@ -413,7 +565,8 @@ class HistogramAxis(object):
             if snap[1] == 'clip':
                 newedges[-1] = min(high, self.edges[highi])
 
-        newaxis = HistogramAxis(newedges, label=copy(self.label))
+        newaxis = HistogramAxis(newedges, label=copy(self.label),
+                                flow=self.flow)
         return HistogramAxis._CutResult(newaxis, mask)
 
     def mergebins(self, nbins=2, snap='low', clip=True):
@@ -455,4 +608,649 @@ class HistogramAxis(object):
                 newedges = np.concatenate(([self.edges[0]],
                                            self.edges[m::nbins]))
 
-        return HistogramAxis(newedges, label=copy(self.label))
+        return HistogramAxis(newedges, label=copy(self.label), flow=self.flow)
+
+
+class UniformAxis(HistogramAxis):
+    r"""A :class:`HistogramAxis` of equal-width bins stored as its number
+    of bins and limits.
+
+    The edges are computed on demand, bins are found in closed form and
+    methods such as :py:meth:`UniformAxis.isuniform`,
+    :py:meth:`UniformAxis.binwidth` and comparisons with other uniform axes
+    take constant time. This is the type of axis created by
+    :class:`Histogram` from a number of bins and limits.
+
+    Args:
+        bins (int): Number of bins.
+        limits (float 2-tuple): `(min,max)` representing the limits of
+        this axis.
+        label (str): The axis label including units if applicable.
+        flow (bool): See :class:`HistogramAxis`.
+        growth (bool): Let a histogram extend this axis, by whole bins,
+        to include entries that are outside of it instead of dropping
+        them. Such an axis can not have flow bins.
+
+    Raises:
+        ValueError: If arguments could not be understood as an axis
+                    along the real line.
+
+    Examples:
+        Uniform axes are equal to the same axis given by its edges::
+
+            a1 = UniformAxis(100, [0, 10])
+            a2 = HistogramAxis(100, [0, 10])
+            assert a1 == a2
+
+        A histogram filled from a stream of unknown range::
+
+            h = Histogram(UniformAxis(4, [0, 2], growth=True))
+            h.fill([0.5, 2.5, -0.5])
+            assert h.axes[0].limits == (-0.5, 2.5)
+            assert h.data.tolist() == [1, 0, 1, 0, 0, 1]
+    """
+    def __init__(self, bins, limits, label=None, flow=False, growth=False):
+        if __debug__:
+            if len(limits) != 2:
+                raise ValueError('limits must be iterable length 2')
+            if bins < 1:
+                raise ValueError('must have at least one bin')
+            if not limits[0] < limits[1]:
+                raise ValueError('limits must be strictly increasing')
+            if not (isinstance(label, string_types) or (label is None)):
+                raise ValueError('label must be string or None')
+        if flow and growth:
+            raise ValueError('a growing axis can not have flow bins')
+        self._nbins = int(bins)
+        # plain floats keep the scalar path of bin() fast
+        self._min = float(limits[0])
+        self._max = float(limits[1])
+        if label is not None:
+            self.label = label
+        self.flow = flow
+        self._growth = bool(growth)
+
+    def __repr__(self):
+        """Complete string representation of the histogram axis."""
+        if not self.growth:
+            return HistogramAxis.__repr__(self)
+        fmt = 'UniformAxis({}, {}{}, growth=True)'
+        lbl = '' if self.label is None else ', label="{}"'.format(self.label)
+        return fmt.format(self.nbins, repr([float(self.min), float(self.max)]),
+                          lbl)
+
+    def __eq__(self, that):
+        """Compare edges to within numpy's default tolerance (see
+        :py:meth:`HistogramAxis.__eq__`)."""
+        if isinstance(that, UniformAxis):
+            return (self.nbins == that.nbins and
+                    np.allclose(self.limits, that.limits))
+        return HistogramAxis.__eq__(self, that)
+
+    @property
+    def edges(self):
+        """The list of bin edges from low to high (read-only, computed on
+        first access and shared as for :py:class:`HistogramAxis`).
+
+        Setting non-uniform edges turns this axis into a plain
+        :py:class:`HistogramAxis`, except for a growing axis which must
+        stay uniform.
+        """
+        return self._cached('edges', lambda: _intern_edges(
+            self._edge(np.arange(self._nbins + 1))))
+
+    @edges.setter
+    def edges(self, e):
+        e = np.asarray(e)
+        if not HistogramAxis(e).isuniform():
+            if self.growth:
+                raise ValueError('edges of a growing axis must be uniform')
+            for attr in ['_nbins', '_min', '_max', '_growth']:
+                self.__dict__.pop(attr, None)
+            self.__class__ = HistogramAxis
+            self.edges = e
+            return
+        self._nbins = len(e) - 1
+        self._min = float(e[0])
+        self._max = float(e[-1])
+        self._cache = {}
+
+    def _edge(self, k):
+        """Value of edge(s) `k`, ``nan`` outside of ``0 <= k <= nbins``.
+
+        The interior edges are ``min + k * width`` as computed by
+        :py:func:`numpy.linspace`.
+        """
+        n = self._nbins
+        e = k * ((self._max - self._min) / n) + self._min
+        e = np.where(k == n, self._max, e)
+        return np.where((k < 0) | (k > n), np.nan, e)
+
+    @property
+    def nbins(self):
+        """Number of bins in this axis."""
+        return self._nbins
+
+    @property
+    def min(self):
+        """Value of the lowest edge."""
+        return self._min
+
+    @property
+    def max(self):
+        """Value of the highest edge."""
+        return self._max
+
+    def binwidth(self, b=1):
+        """Width of the bins (all bins are of the same width)."""
+        return self.range / self._nbins
+
+    def isuniform(self, rtol=1e-05, atol=1e-08):
+        """Always True for this axis."""
+        return True
+
+    def inaxis(self, x):
+        """Check if `x` is within this axis: ``min <= x < max``."""
+        return self._min <= x < self._max
+
+    def bin(self, x):
+        """Bin index for the value `x` (see :py:meth:`HistogramAxis.bin`).
+
+        The bin is found arithmetically and corrected for round-off against
+        the edges without computing all of them.
+        """
+        n = self._nbins
+        low, high = self._min, self._max
+        width = (high - low) / n
+        if isinstance(x, _SCALAR_TYPES):
+            x = float(x)
+            if not low <= x < high:
+                return -1 if x < low else n
+            b = min(int((x - low) * (n / (high - low))), n - 1)
+            if x < b * width + low:
+                return b - 1
+            if b + 1 < n and x >= (b + 1) * width + low:
+                return b + 1
+            return b
+        shape = np.shape(x)
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        b = x - self._min
+        b *= n / (self._max - self._min)
+        b = np.floor(b, out=b)
+        b = np.clip(b, 0, n - 1, out=b)
+        # edges of bin b as in _edge(): the bin of x is b - 1, b or b + 1
+        upper = b + 1
+        upper *= width
+        upper += self._min
+        upper[b == n - 1] = self._max
+        lower = b * width
+        lower += self._min
+        b -= x < lower
+        b += x >= upper
+        b[np.isnan(x)] = n
+        return b.astype(np.intp).reshape(shape)[()]
+
+    def mergebins(self, nbins=2, snap='low', clip=True):
+        """Merge neighboring bins (see :py:meth:`HistogramAxis.mergebins`).
+
+        The result is a :class:`UniformAxis` unless `clip` is False and
+        `nbins` does not evenly divide the number of bins in this axis.
+        """
+        d, m = divmod(self._nbins, nbins)
+        if m != 0 and not clip:
+            return HistogramAxis.mergebins(self, nbins, snap, clip)
+        if __debug__:
+            if snap not in ['low', 'high']:
+                raise ValueError('Unknown snap keyword: ' + snap)
+            if d < 1:
+                raise ValueError('cannot merge more bins than are in axis')
+        low = 0 if (m == 0 or snap == 'low') else m
+        limits = self._edge(np.array([low, low + d * nbins]))
+        return UniformAxis(d, limits, label=copy(self.label),
+                           flow=self.flow, growth=self.growth)
+
+    def _grown(self, low, high):
+        """This axis extended by whole bins to include `low` and `high`.
+
+        Returns the new axis and the number of bins added below and above.
+        """
+        width = self.binwidth()
+        below = max(0, int(np.ceil((self._min - low) / width)))
+        above = max(0, int(np.ceil((high - self._max) / width)))
+        # guard against round-off in the new limits
+        while low < self._min - below * width:
+            below += 1
+        while high > self._max + above * width:
+            above += 1
+        limits = (self._min - below * width, self._max + above * width)
+        axis = UniformAxis(self._nbins + below + above, limits,
+                           label=copy(self.label), growth=self.growth)
+        return axis, below, above
+
+    def __deepcopy__(self, memo):
+        """Deep copy of this instance."""
+        cls = self.__class__
+        newaxis = cls.__new__(cls)
+        memo[id(self)] = newaxis
+        newaxis._nbins = self._nbins
+        newaxis._min = self._min
+        newaxis._max = self._max
+        newaxis._label = deepcopy(self.label, memo)
+        newaxis._flow = self.flow
+        newaxis._growth = self.growth
+        # cached arrays are read-only and can be shared
+        newaxis._cache = dict(getattr(self, '_cache', {}))
+        return newaxis
+
+
+# transforms of TransformedAxis that can be given (and serialized) by name
+_TRANSFORMS = {
+    'log': (np.log, np.exp),
+    'sqrt': (np.sqrt, np.square),
+}
+
+
+class TransformedAxis(HistogramAxis):
+    r"""A :class:`HistogramAxis` with bins of equal width after a monotonic
+    transform of the values, such as a logarithmic axis.
+
+    Bins are found by transforming the value and binning arithmetically in
+    the transformed space, so that filling does not depend on the number
+    of bins. The edges are the inverse transform of uniform edges between
+    the transformed limits.
+
+    Args:
+        bins (int): Number of bins.
+        limits (float 2-tuple): `(min,max)` representing the limits of
+        this axis (not transformed).
+        transform (str or callable 2-tuple): Either the name of a transform,
+        ``'log'`` or ``'sqrt'``, or a pair of vectorized functions
+        `(forward, inverse)` where `forward` is strictly increasing over
+        the limits. Only named transforms are kept when serializing.
+        label (str): The axis label including units if applicable.
+        flow (bool): See :class:`HistogramAxis`.
+
+    Raises:
+        ValueError: If the transform is unknown, is not finite at the
+                    limits or is not increasing over the limits.
+
+    Example::
+
+        a1 = TransformedAxis(60, [1, 1e6], 'log')
+        a2 = HistogramAxis(np.logspace(0, 6, 61))
+        assert a1 == a2
+    """
+    def __init__(self, bins, limits, transform, label=None, flow=False):
+        if isinstance(transform, string_types):
+            if transform not in _TRANSFORMS:
+                raise ValueError('unknown transform: ' + transform)
+            transform = text_type(transform)
+            forward, inverse = _TRANSFORMS[transform]
+        else:
+            forward, inverse = transform
+        if __debug__:
+            if len(limits) != 2:
+                raise ValueError('limits must be iterable length 2')
+            if not limits[0] < limits[1]:
+                raise ValueError('limits must be strictly increasing')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            tlimits = forward(np.asarray(limits, dtype=np.float64))
+        if not np.all(np.isfinite(tlimits)):
+            raise ValueError('transform of the limits must be finite')
+        if not tlimits[0] < tlimits[1]:
+            raise ValueError('transform must be increasing over the limits')
+        self._transform = transform
+        self._forward = forward
+        self._inverse = inverse
+        self._min = np.float64(limits[0])
+        self._max = np.float64(limits[1])
+        self._uniform = UniformAxis(bins, tlimits)
+        if label is not None:
+            self.label = label
+        self.flow = flow
+
+    @property
+    def transform(self):
+        """Name of the transform or the `(forward, inverse)` pair."""
+        return self._transform
+
+    def __eq__(self, that):
+        """Compare edges to within numpy's default tolerance (see
+        :py:meth:`HistogramAxis.__eq__`)."""
+        if (isinstance(that, TransformedAxis) and
+                that.transform == self.transform):
+            return (self.nbins == that.nbins and
+                    np.allclose(self.limits, that.limits))
+        return HistogramAxis.__eq__(self, that)
+
+    @property
+    def edges(self):
+        """The list of bin edges from low to high (read-only, cached)."""
+        return self._cached('edges', lambda: self._edge(
+            np.arange(self.nbins + 1)))
+
+    @edges.setter
+    def edges(self, e):
+        e = np.asarray(e, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = self._forward(e)
+        if not np.all(np.isfinite(t)):
+            raise ValueError('transform of the edges must be finite')
+        if not HistogramAxis(t).isuniform():
+            raise ValueError('edges of a TransformedAxis must be uniform '
+                             'after the transform')
+        self._min = e[0]
+        self._max = e[-1]
+        self._uniform = UniformAxis(len(e) - 1, t[[0, -1]])
+        self._cache = {}
+
+    def _edge(self, k):
+        """Value of edge(s) `k`, ``nan`` outside of ``0 <= k <= nbins``."""
+        e = self._inverse(self._uniform._edge(k))
+        e = np.where(k == 0, self._min, e)
+        return np.where(k == self.nbins, self._max, e)
+
+    @property
+    def nbins(self):
+        """Number of bins in this axis."""
+        return self._uniform.nbins
+
+    @property
+    def min(self):
+        """Value of the lowest edge."""
+        return self._min
+
+    @property
+    def max(self):
+        """Value of the highest edge."""
+        return self._max
+
+    def inaxis(self, x):
+        """Check if `x` is within this axis: ``min <= x < max``."""
+        return self._min <= x < self._max
+
+    def bin(self, x):
+        """Bin index for the value `x` (see :py:meth:`HistogramAxis.bin`).
+
+        Values are clipped to the limits, transformed and binned
+        arithmetically. The result is then corrected for round-off of the
+        transform against the edges.
+        """
+        shape = np.shape(x)
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        n = self.nbins
+        tmin, tmax = self._uniform.limits
+        width = (tmax - tmin) / n
+        b = self._forward(np.clip(x, self._min, self._max))
+        b -= tmin
+        b *= n / (tmax - tmin)
+        b = np.floor(b, out=b)
+        b = np.clip(b, 0, n - 1, out=b)
+        # edges of bin b as in _edge(): the bin of x is b - 1, b or b + 1
+        upper = b + 1
+        upper *= width
+        upper += tmin
+        upper = self._inverse(upper)
+        upper[b == n - 1] = self._max
+        lower = b * width
+        lower += tmin
+        lower = self._inverse(lower)
+        lower[b == 0] = self._min
+        b -= x < lower
+        b += x >= upper
+        b[np.isnan(x)] = n
+        return b.astype(np.intp).reshape(shape)[()]
+
+    def mergebins(self, nbins=2, snap='low', clip=True):
+        """Merge neighboring bins (see :py:meth:`HistogramAxis.mergebins`).
+
+        The result is a :class:`TransformedAxis` unless `clip` is False and
+        `nbins` does not evenly divide the number of bins in this axis.
+        """
+        d, m = divmod(self.nbins, nbins)
+        if m != 0 and not clip:
+            return HistogramAxis.mergebins(self, nbins, snap, clip)
+        if __debug__:
+            if snap not in ['low', 'high']:
+                raise ValueError('Unknown snap keyword: ' + snap)
+            if d < 1:
+                raise ValueError('cannot merge more bins than are in axis')
+        low = 0 if (m == 0 or snap == 'low') else m
+        limits = self._edge(np.array([low, low + d * nbins]))
+        return TransformedAxis(d, limits, self.transform,
+                               label=copy(self.label), flow=self.flow)
+
+    def asdict(self, encoding=None):
+        ret = HistogramAxis.asdict(self, encoding)
+        if isinstance(self.transform, string_types):
+            if encoding is not None:
+                ret['transform'] = self.transform.encode(encoding)
+            else:
+                ret['transform'] = self.transform
+        return ret
+
+    def __deepcopy__(self, memo):
+        """Deep copy of this instance."""
+        cls = self.__class__
+        newaxis = cls.__new__(cls)
+        memo[id(self)] = newaxis
+        newaxis._transform = self._transform
+        newaxis._forward = self._forward
+        newaxis._inverse = self._inverse
+        newaxis._min = self._min
+        newaxis._max = self._max
+        newaxis._uniform = self._uniform
+        newaxis._label = deepcopy(self.label, memo)
+        newaxis._flow = self.flow
+        newaxis._cache = dict(getattr(self, '_cache', {}))
+        return newaxis
+
+
+class IntegerAxis(UniformAxis):
+    r"""A :class:`UniformAxis` with one bin for each integer from `start`
+    up to, but not including, `stop`.
+
+    The edges lie half-way between the integers so that the bin centers
+    are the integers themselves. Arrays of integers are binned by
+    subtracting `start`.
+
+    Args:
+        start (int): First integer of this axis.
+        stop (int): One past the last integer of this axis.
+        label (str): The axis label including units if applicable.
+        flow (bool): See :class:`HistogramAxis`.
+
+    Example::
+
+        a = IntegerAxis(1000, 1010, 'run')
+        assert a.nbins == 10
+        assert a.bin(1003) == 3
+        assert a.limits == (999.5, 1009.5)
+    """
+    def __init__(self, start, stop, label=None, flow=False):
+        if __debug__:
+            if int(start) != start or int(stop) != stop:
+                raise ValueError('start and stop must be integers')
+            if not start < stop:
+                raise ValueError('stop must be greater than start')
+        UniformAxis.__init__(self, stop - start, (start - 0.5, stop - 0.5),
+                             label=label, flow=flow)
+        self._start = int(start)
+
+    def __repr__(self):
+        """Complete string representation of the histogram axis."""
+        fmt = 'IntegerAxis({}, {}{}{})'
+        lbl = '' if self.label is None else ', label="{}"'.format(self.label)
+        flow = ', flow=True' if self.flow else ''
+        return fmt.format(self.start, self.stop, lbl, flow)
+
+    # the edges follow from start and stop
+    edges = property(UniformAxis.edges.fget, doc=UniformAxis.edges.__doc__)
+
+    @property
+    def start(self):
+        """First integer of this axis."""
+        return self._start
+
+    @property
+    def stop(self):
+        """One past the last integer of this axis."""
+        return self._start + self.nbins
+
+    def bin(self, x):
+        """Bin index for the value `x` (see :py:meth:`HistogramAxis.bin`).
+
+        For integers, this is ``x - start`` limited to ``[-1, nbins]``.
+        """
+        x = np.asarray(x)
+        if x.dtype.kind not in 'iu':
+            return UniformAxis.bin(self, x)
+        b = x.astype(np.intp) - self._start
+        return np.clip(b, -1, self.nbins)[()]
+
+    def cut(self, low, high=None, snap='nearest'):
+        """Return a truncated :py:class:`IntegerAxis` keeping the integers
+        from `low` to `high` inclusive (see :py:meth:`HistogramAxis.cut`).
+        `snap` is ignored."""
+        n = self.nbins
+        lowi = 0 if low is None else int(np.floor(low + 0.5)) - self._start
+        highi = n if high is None else int(np.floor(high + 0.5)) - self._start + 1
+        lowi, highi = max(lowi, 0), min(highi, n)
+        if not lowi < highi:
+            raise ValueError('cut does not include any integer of the axis')
+        mask = np.zeros((n,), dtype=bool)
+        mask[lowi:highi] = True
+        newaxis = IntegerAxis(self._start + lowi, self._start + highi,
+                              label=copy(self.label), flow=self.flow)
+        return HistogramAxis._CutResult(newaxis, mask)
+
+    def asdict(self, encoding=None):
+        ret = HistogramAxis.asdict(self, encoding)
+        ret['integer'] = True
+        return ret
+
+    def __deepcopy__(self, memo):
+        """Deep copy of this instance."""
+        newaxis = UniformAxis.__deepcopy__(self, memo)
+        newaxis._start = self._start
+        return newaxis
+
+
+class CategoryAxis(UniformAxis):
+    r"""An axis with one bin for each of a list of categories such as names
+    or (not necessarily consecutive) identification numbers.
+
+    The bins are the unit intervals centered on the index of each category
+    so that this is also a :class:`UniformAxis` from -0.5 to ``nbins -
+    0.5``. Single values are looked up in a dictionary and arrays of
+    numbers or strings with a binary search over the sorted categories.
+    Values which are not among the categories are given the overflow bin.
+
+    Args:
+        categories (list): Unique strings or numbers.
+        label (str): The axis label including units if applicable.
+        flow (bool): See :class:`HistogramAxis`. The overflow bin counts
+        the entries which are not among the categories.
+
+    Example::
+
+        h = Histogram(CategoryAxis(['e', 'mu', 'tau'], 'lepton'))
+        h.fill(['mu', 'e', 'mu', 'pi'])
+        assert h.data.tolist() == [1, 2, 0]
+    """
+    def __init__(self, categories, label=None, flow=False):
+        categories = np.array(categories)
+        if __debug__:
+            if categories.ndim != 1 or len(categories) < 1:
+                raise ValueError('categories must be a list of one or more '
+                                 'values')
+            if len(np.unique(categories)) != len(categories):
+                raise ValueError('categories must be unique')
+        n = len(categories)
+        UniformAxis.__init__(self, n, (-0.5, n - 0.5), label=label, flow=flow)
+        categories.flags.writeable = False
+        self._categories = categories
+        self._index = {c: i for i, c in enumerate(categories.tolist())}
+        self._order = np.argsort(categories, kind='mergesort')
+        self._sorted = categories[self._order]
+
+    def __repr__(self):
+        """Complete string representation of the histogram axis."""
+        fmt = 'CategoryAxis({}{}{})'
+        lbl = '' if self.label is None else ', label="{}"'.format(self.label)
+        flow = ', flow=True' if self.flow else ''
+        return fmt.format(repr(self.categories.tolist()), lbl, flow)
+
+    def __eq__(self, that):
+        """Compare the categories of two category axes."""
+        return (isinstance(that, CategoryAxis) and
+                np.array_equal(self.categories, that.categories))
+
+    # the edges follow from the number of categories
+    edges = property(UniformAxis.edges.fget, doc=UniformAxis.edges.__doc__)
+
+    @property
+    def categories(self):
+        """Read-only array of the categories in bin order."""
+        return self._categories
+
+    def inaxis(self, x):
+        """Check if `x` is one of the categories."""
+        return x in self._index
+
+    def bin(self, x):
+        """Bin index of the category `x` or of each category in the array
+        `x`. Values which are not categories give ``nbins``."""
+        n = self.nbins
+        if np.ndim(x) == 0:
+            x = x.item() if isinstance(x, np.generic) else x
+            return self._index.get(x, n)
+        x = np.asarray(x)
+        kind, ckind = x.dtype.kind, self._sorted.dtype.kind
+        if ((kind in 'biuf' and ckind in 'biuf') or
+                (kind in 'SU' and kind == ckind)):
+            i = np.searchsorted(self._sorted, x)
+            np.clip(i, 0, n - 1, out=i)
+            return np.where(self._sorted[i] == x, self._order[i], n)
+        return np.fromiter(map(self._index.get, x.tolist(), repeat(n)),
+                           dtype=np.intp, count=len(x))
+
+    def cut(self, low, high=None, snap='nearest'):
+        """Return a :py:class:`CategoryAxis` of the categories from `low` to
+        `high` inclusive, in bin order (see :py:meth:`HistogramAxis.cut`).
+        `snap` is ignored."""
+        n = self.nbins
+        try:
+            lowi = 0 if low is None else self._index[low]
+            highi = n if high is None else self._index[high] + 1
+        except KeyError as e:
+            raise ValueError('unknown category: {}'.format(e))
+        if not lowi < highi:
+            raise ValueError('cut does not include any category')
+        mask = np.zeros((n,), dtype=bool)
+        mask[lowi:highi] = True
+        newaxis = CategoryAxis(self.categories[lowi:highi],
+                               label=copy(self.label), flow=self.flow)
+        return HistogramAxis._CutResult(newaxis, mask)
+
+    def mergebins(self, nbins=2, snap='low', clip=True):
+        """Categories can not be merged."""
+        raise ValueError('can not merge the bins of a CategoryAxis')
+
+    def asdict(self, encoding=None):
+        ret = HistogramAxis.asdict(self, encoding)
+        categories = self.categories
+        if encoding is not None and categories.dtype.kind == 'U':
+            categories = np.char.encode(categories, encoding)
+        ret['categories'] = categories
+        return ret
+
+    def __deepcopy__(self, memo):
+        """Deep copy of this instance."""
+        newaxis = UniformAxis.__deepcopy__(self, memo)
+        # the lookup tables are never modified and can be shared
+        newaxis._categories = self._categories
+        newaxis._index = self._index
+        newaxis._order = self._order
+        newaxis._sorted = self._sorted
+        return newaxis
@@ -0,0 +1,110 @@
+from __future__ import division
+
+import multiprocessing as mp
+from multiprocessing.sharedctypes import RawArray
+
+import numpy as np
+
+# state of a worker process (see _init_worker)
+_worker = {}
+
+
+def _shared_slots(shared, nslots):
+    """View of a shared block of doubles as an array of `nslots` rows."""
+    return np.frombuffer(shared, dtype=np.float64).reshape(nslots, -1)
+
+
+def _init_worker(template, reader, shared, nslots, counter):
+    """Give this worker a partial histogram whose arrays are its own row of
+    the shared block."""
+    with counter.get_lock():
+        slot = counter.value
+        counter.value += 1
+    if slot >= nslots:
+        raise RuntimeError('more worker processes than shared slots.')
+    row = _shared_slots(shared, nslots)[slot]
+    hist = template.copy(np.float64)
+    size = hist.flow_data.size
+    hist._set_flow_data(row[:size].reshape(hist.flow_data.shape))
+    if hist.storage == 'weighted':
+        hist._set_flow_variance(row[size:].reshape(hist.flow_data.shape))
+    _worker['hist'] = hist
+    _worker['reader'] = reader
+
+
+def _fill_file(filename):
+    """Fill the partial histogram of this worker from a single file."""
+    _worker['hist'].fill(*_worker['reader'](filename))
+
+
+def fill_files(files, hist_template, reader, processes=None):
+    """Fill a histogram from many files using a pool of processes.
+
+    Each worker process fills a partial histogram with the same axes as
+    ``hist_template`` whose data (and variance for weighted storage) is a
+    row of a block of shared memory
+    (:py:func:`multiprocessing.sharedctypes.RawArray`). Once all files are
+    read, the rows are summed in the parent process so that no histogram
+    arrays are pickled back from the workers.
+
+    Args:
+        files (iterable): File names (or any picklable object) passed to
+            ``reader``, one task per file.
+        hist_template (Histogram): Defines the axes and storage. It is not
+            modified. An uncertainty set explicitly on it is not kept.
+        reader (callable): Picklable (module-level) function which takes a
+            file name and returns the arguments to :py:meth:`Histogram.fill`,
+            i.e. the sample ``(x, y, ...)`` with optional weights.
+        processes (int): Number of worker processes. (default: number of
+            CPUs)
+
+    Returns:
+        Histogram: Copy of ``hist_template`` with the content of all files
+        added.
+
+    Example::
+
+        import numpy as np
+        from histogram import Histogram
+        from histogram.parallel import fill_files
+
+        def read(filename):
+            data = np.load(filename)
+            return data['x'], data['y'], data['weight']
+
+        h = fill_files(['run1.npz', 'run2.npz'],
+                       Histogram(100, [0, 10], 100, [0, 10]), read)
+
+    The partial histograms are accumulated as `numpy.float64`, which is
+    exact for integer counts below 2**53. Axes which grow (see
+    :class:`UniformAxis`) are not supported.
+    """
+    if any(ax.growth for ax in hist_template.axes):
+        # each worker would grow its own axes off the shared block
+        raise ValueError('fill_files does not support growing axes.')
+    if processes is None:
+        processes = mp.cpu_count()
+    size = hist_template.flow_data.size
+    nvalues = 2 * size if hist_template.storage == 'weighted' else size
+    shared = RawArray('d', processes * nvalues)
+    counter = mp.Value('i', 0)
+    pool = mp.Pool(processes, _init_worker,
+                   (hist_template, reader, shared, processes, counter))
+    try:
+        for _ in pool.imap_unordered(_fill_file, files):
+            pass
+    finally:
+        pool.close()
+        pool.join()
+
+    total = _shared_slots(shared, processes).sum(0)
+    ret = hist_template.copy()
+    data = ret.flow_data
+    data += total[:size].reshape(data.shape).astype(data.dtype)
+    if ret.storage == 'weighted':
+        variance = ret.flow_variance
+        variance += total[size:].reshape(variance.shape)
+    else:
+        # an uncertainty set on the template does not hold for the new counts
+        del ret.uncert
+    return ret
@@ -4,6 +4,9 @@ from .detail import RunControl
 rc = RunControl()
 
 rc.fill_type = 'int'
+rc.fill.threads = 1
+rc.fill.chunksize = 2**20
+rc.fill.buffer_size = 2**16
 rc.plot.baseline = 'bottom'
 rc.plot.patch.alpha = 0.6
 
@@ -14,13 +14,19 @@ def create_dataset(group, name, data):
 
 
 def save_histogram_hdf5_group(hist, grp):
-    create_dataset(grp, 'data', hist.data)
-    if hist.has_uncert:
+    create_dataset(grp, 'data', hist.flow_data)
+    if hist.storage == 'weighted':
+        create_dataset(grp, 'variance', hist.flow_variance)
+    elif hist.has_uncert:
         create_dataset(grp, 'uncert', hist.uncert)
     for i, ax in enumerate(hist.axes):
         edge = create_dataset(grp, 'edges{}'.format(i), ax.edges)
-        if ax.label is not None:
-            edge.attrs['label'] = ax.label
+        for k, v in ax.asdict().items():
+            if k != 'edges':
+                if isinstance(v, np.ndarray) and v.dtype.kind == 'U':
+                    # HDF5 attributes can not hold arrays of unicode
+                    v = np.char.encode(v, 'utf-8')
+                edge.attrs[k] = v
     if hist.label is not None:
         grp.attrs['label'] = hist.label
     if hist.title is not None:
@@ -32,14 +38,19 @@ def load_histogram_hdf5_group(grp):
     axes = []
     for i in range(len(data.shape)):
         edges = grp['edges{}'.format(i)]
-        label = edges.attrs.get('label', None)
-        axes.append(HistogramAxis(edges, label=label))
+        axdict = dict(edges.attrs)
+        for k, v in axdict.items():
+            if isinstance(v, np.ndarray) and v.dtype.kind == 'S':
+                axdict[k] = np.char.decode(v, 'utf-8')
+        axdict['edges'] = edges[...]
+        axes.append(HistogramAxis.fromdict(axdict))
     label = grp.attrs.get('label', None)
     title = grp.attrs.get('title', None)
     return Histogram(
         *axes,
         data=data,
         uncert=grp.get('uncert', None),
+        variance=grp.get('variance', None),
         label=label,
         title=title)
 
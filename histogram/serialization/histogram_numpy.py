@@ -19,6 +19,6 @@ def load_histogram_npz(filepath):
     '''
     hdict = dict(np.load(filepath, encoding='bytes'))
     for k, v in hdict.items():
-        if v.dtype.char in ['S', 'U']:
+        if v.dtype.char in ['S', 'U'] and v.ndim == 0:
             hdict[k] = v.tostring()
     return Histogram.fromdict(hdict, 'utf-8')
@@ -0,0 +1,403 @@
+from __future__ import division, unicode_literals
+
+from copy import copy, deepcopy
+
+import numpy as np
+from uncertainties import ufloat
+
+from .histogram import (Histogram, _parse_axes, _asample, _flat_bins,
+                        _cut_ranges)
+from . import rc
+
+
+class SparseHistogram(object):
+    """N-dimensional histogram which stores only its filled bins.
+
+    This has the same axes as a :py:class:`Histogram` but the memory used
+    depends on the number of filled bins rather than on the total number of
+    bins. It is meant for high-dimensional histograms which are mostly
+    empty. A 5D histogram with 200 bins per axis has 3.2e11 bins which can
+    not be allocated as a dense array, but filling a few million entries
+    into a :py:class:`SparseHistogram` takes only as many bins as are hit.
+
+    The filled bins are kept as sorted arrays of their index into the
+    flattened (C-ordered) data along with the sum of weights and the sum of
+    squared weights of each. Fills are appended to a list of pending entries
+    which is compacted (sorted and summed per bin) once it holds
+    ``compact`` entries or when the contents are read.
+
+    Args:
+        axes (list): List of :py:class:`HistogramAxis` or constructor
+            parameters thereof as accepted by :py:class:`Histogram`. Flow
+            bins are not supported.
+
+    Keyword Args:
+        label (str): Label for the filled data.
+        title (str): Title of this histogram.
+        dtype (scalar type): Type of the summed weights. (default:
+            ``rc.fill_type``)
+        compact (int): Number of pending entries before they are merged into
+            the stored bins. (default: ``rc.fill.chunksize``)
+
+    Example::
+
+        import numpy as np
+        from histogram import SparseHistogram
+
+        h = SparseHistogram(*([200, [0, 10]] * 5))
+        h.fill_from_sample(np.random.normal(5, 0.1, (5, 10000)))
+
+        print(h.nnz)
+        print(h.projection(0).todense())
+    """
+    def __init__(self, *axes, **kwargs):
+        label = kwargs.pop('label', None)
+        title = kwargs.pop('title', None)
+        dtype = kwargs.pop('dtype', None)
+        compact = kwargs.pop('compact', None)
+
+        if not axes:
+            raise TypeError('you must specify at least one axis.')
+
+        self.axes, self.label, self.title = _parse_axes(axes, label, title)
+        if any(ax.flow for ax in self.axes):
+            raise ValueError('SparseHistogram does not support flow bins.')
+        if any(ax.growth for ax in self.axes):
+            raise ValueError('SparseHistogram does not support growing axes.')
+
+        self._compact = compact or rc.fill.chunksize
+        self._index = np.zeros(0, dtype=np.intp)
+        self._sumw = np.zeros(0, dtype=(dtype or rc.fill_type))
+        self._sumw2 = np.zeros(0, dtype=np.float64)
+        self._pending = []
+        self._npending = 0
+
+    @property
+    def dim(self):
+        """Dimension of this histogram (number of axes)"""
+        return len(self.axes)
+
+    @property
+    def shape(self):
+        """Shape of the (dense) data of this histogram"""
+        return tuple(ax.nbins for ax in self.axes)
+
+    @property
+    def size(self):
+        """Total number of bins, filled or not"""
+        return int(np.prod(self.shape, dtype=np.int64))
+
+    @property
+    def edges(self):
+        """Edges of each axis as a tuple of arrays"""
+        return tuple(ax.edges for ax in self.axes)
+
+    @property
+    def dtype(self):
+        """Type of the summed weights"""
+        return self._sumw.dtype
+
+    @property
+    def nnz(self):
+        """Number of stored (filled) bins"""
+        self._compact_pending()
+        return len(self._index)
+
+    @property
+    def bins(self):
+        """Tuple of arrays of the bin index along each axis of the stored
+        bins."""
+        self._compact_pending()
+        return np.unravel_index(self._index, self.shape)
+
+    @property
+    def values(self):
+        """Sum of weights of the stored bins."""
+        self._compact_pending()
+        return self._sumw
+
+    @property
+    def variance(self):
+        """Sum of squared weights of the stored bins."""
+        self._compact_pending()
+        return self._sumw2
+
+    @property
+    def uncert(self):
+        """Uncertainty (square root of the variance) of the stored bins."""
+        return np.sqrt(self.variance)
+
+    def _push(self, index, sumw=None, sumw2=None):
+        """Append entries to the pending list.
+
+        `sumw` defaults to one for each entry and `sumw2` to the square of
+        `sumw`.
+        """
+        if sumw is None:
+            sumw = np.ones(len(index))
+        if sumw2 is None:
+            sumw2 = np.square(sumw, dtype=np.float64)
+        self._pending.append((index, sumw, sumw2))
+        self._npending += len(index)
+        if self._npending >= self._compact:
+            self._compact_pending()
+
+    def _compact_pending(self):
+        """Merge pending entries into the sorted arrays of stored bins."""
+        if not self._pending:
+            return
+        index = [self._index] + [p[0] for p in self._pending]
+        sumw = [self._sumw] + [p[1] for p in self._pending]
+        sumw2 = [self._sumw2] + [p[2] for p in self._pending]
+        self._index, inverse = np.unique(np.concatenate(index),
+                                         return_inverse=True)
+        n = len(self._index)
+        self._sumw = np.bincount(inverse, np.concatenate(sumw),
+                                 minlength=n).astype(self.dtype)
+        self._sumw2 = np.bincount(inverse, np.concatenate(sumw2),
+                                  minlength=n)
+        self._pending = []
+        self._npending = 0
+
+    def fill(self, *args):
+        """Fill histogram with sample data.
+
+        Same as :py:meth:`Histogram.fill`: the arguments are the sample of
+        data with optional associated weights.
+        """
+        if len(args) > self.dim:
+            sample = args[:-1]
+            weights = args[-1]
+        else:
+            sample = args
+            weights = None
+        self.fill_from_sample(sample, weights)
+
+    def fill_one(self, pt, wt=1):
+        """Fill a single data point"""
+        self.fill_from_sample(np.reshape(pt, (self.dim, 1)), wt)
+
+    def fill_from_sample(self, sample, weights=None):
+        """Fill histogram from sample of data
+
+        This fills the histogram from sample with shape `(D, N)` array where
+        `D` is the dimension of the histogram and `N` is the number of points
+        to fill. The optional ``weights`` may be a single number or an array
+        of length `N`. Binning is the same as for
+        :py:meth:`Histogram.fill_from_sample`.
+        """
+        sample = _asample(sample, self.dim)
+        flat = _flat_bins(self.axes, sample)
+        inside = flat < self.size
+        if weights is not None:
+            weights = np.broadcast_to(np.asarray(weights, dtype=np.float64),
+                                      flat.shape)[inside]
+        self._push(flat[inside], weights)
+
+    def __call__(self, *xx, **kwargs):
+        """Value of histogram at a point or array of points
+
+        Keyword Args:
+            overflow_value (number): Return value when the point lies outside
+                this histogram. (default: 0)
+        """
+        overflow_value = kwargs.pop('overflow_value', 0)
+        self._compact_pending()
+        xx = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64)
+                                   for x in xx])
+        shape = xx[0].shape
+        flat = _flat_bins(self.axes, np.array([x.ravel() for x in xx]))
+        ret = np.zeros(flat.shape, dtype=self.dtype)
+        if len(self._index):
+            pos = np.searchsorted(self._index, flat)
+            pos = np.minimum(pos, len(self._index) - 1)
+            found = self._index[pos] == flat
+            ret[found] = self._sumw[pos[found]]
+        outside = flat == self.size
+        # unlike filling, the upper edge is outside as for Histogram
+        for x, ax in zip(xx, self.axes):
+            outside |= x.ravel() == ax.max
+        if np.any(outside):
+            ret = ret.astype(np.result_type(ret, overflow_value))
+            ret[outside] = overflow_value
+        return ret.reshape(shape) if shape else ret[0]
+
+    def _new(self, axes):
+        """Empty histogram with the same labels and dtype over `axes`"""
+        return SparseHistogram(*axes, label=copy(self.label),
+                               title=copy(self.title), dtype=self.dtype,
+                               compact=self._compact)
+
+    def sum(self, *axes):
+        """Sum of bin values or sum along one or more axes.
+
+        Returns the sum over all values (:py:class:`uncertainties.ufloat`)
+        or sums only over specific axes and returns a new
+        :py:class:`SparseHistogram` with reduced dimension.
+        """
+        all_axes = tuple(range(self.dim))
+        axes = all_axes if len(axes) == 0 else tuple(sorted(axes))
+        if axes == all_axes:
+            return ufloat(self.values.sum(), np.sqrt(self.variance.sum()))
+        keep = [i for i in all_axes if i not in axes]
+        bins = self.bins
+        ret = self._new([self.axes[i] for i in keep])
+        flat = np.ravel_multi_index([bins[i] for i in keep], ret.shape)
+        ret._push(flat, self._sumw, self._sumw2)
+        ret._compact_pending()
+        return ret
+
+    def projection(self, axis):
+        """Projection onto a single axis."""
+        sumaxes = set(range(self.dim)) - {axis}
+        return self.sum(*sumaxes)
+
+    def cut(self, *args, **kwargs):
+        """Truncate a histogram along one or more axes.
+
+        Takes the same arguments as :py:meth:`Histogram.cut`.
+        """
+        rng = _cut_ranges(args, self.dim, kwargs.pop('axis', None))
+        bins = list(self.bins)
+        keep = np.ones(len(self._index), dtype=bool)
+        newaxes = []
+        for i, ax in enumerate(self.axes):
+            xlow, xhigh = rng[i] if i < len(rng) else (None, None)
+            if (xlow is None) and (xhigh is None):
+                newaxes.append(ax.copy())
+            else:
+                a, m = ax.cut(xlow, xhigh, ('nearest', 'nearest'))
+                indices = np.flatnonzero(m)
+                keep &= (bins[i] >= indices[0]) & (bins[i] <= indices[-1])
+                bins[i] = bins[i] - indices[0]
+                newaxes.append(a)
+        ret = self._new(newaxes)
+        flat = np.ravel_multi_index([b[keep] for b in bins], ret.shape)
+        ret._push(flat, self._sumw[keep], self._sumw2[keep])
+        ret._compact_pending()
+        return ret
+
+    def todense(self):
+        """Convert to a :py:class:`Histogram` with weighted storage."""
+        self._compact_pending()
+        data = np.zeros(self.shape, dtype=self.dtype)
+        variance = np.zeros(self.shape, dtype=np.float64)
+        data.flat[self._index] = self._sumw
+        variance.flat[self._index] = self._sumw2
+        return Histogram(*[ax.copy() for ax in self.axes], data=data,
+                         variance=variance, label=copy(self.label),
+                         title=copy(self.title))
+
+    @staticmethod
+    def fromdense(hist):
+        """Create a :py:class:`SparseHistogram` from the non-empty bins of a
+        :py:class:`Histogram`. Flow bins are dropped."""
+        axes = [ax.copy() for ax in hist.axes]
+        for ax in axes:
+            ax.flow = False
+        ret = SparseHistogram(*axes, label=copy(hist.label),
+                              title=copy(hist.title), dtype=hist.data.dtype)
+        data = hist.data.ravel()
+        variance = np.asarray(hist.variance, dtype=np.float64).ravel()
+        ret._index = np.flatnonzero((data != 0) | (variance != 0))
+        ret._sumw = data[ret._index]
+        ret._sumw2 = variance[ret._index]
+        return ret
+
+    def copy(self, dtype=None):
+        """Copy this histogram optionally changing dtype."""
+        self._compact_pending()
+        ret = self._new([deepcopy(ax) for ax in self.axes])
+        ret._index = self._index.copy()
+        ret._sumw = self._sumw.astype(dtype or self.dtype)
+        ret._sumw2 = self._sumw2.copy()
+        return ret
+
+    def __copy__(self):
+        """Create a complete copy of this histogram."""
+        return self.copy()
+
+    def __deepcopy__(self, memo=None):
+        """Create a complete copy of this histogram."""
+        return self.copy()
+
+    def _check_axes(self, that):
+        if not (self.dim == that.dim and
+                all(a == aa for a, aa in zip(self.axes, that.axes))):
+            raise ValueError('histogram axes must match.')
+
+    def __iadd__(self, that):
+        """In-place addition of another :py:class:`SparseHistogram`."""
+        if not isinstance(that, SparseHistogram):
+            return NotImplemented
+        self._check_axes(that)
+        that._compact_pending()
+        self._push(that._index, that._sumw, that._sumw2)
+        return self
+
+    def __isub__(self, that):
+        """In-place subtraction of another :py:class:`SparseHistogram`."""
+        if not isinstance(that, SparseHistogram):
+            return NotImplemented
+        self._check_axes(that)
+        that._compact_pending()
+        self._push(that._index, -that._sumw, that._sumw2)
+        return self
+
+    def __imul__(self, that):
+        """In-place multiplication by a number."""
+        if np.ndim(that) != 0 or isinstance(that, (Histogram,
+                                                   SparseHistogram)):
+            return NotImplemented
+        self._compact_pending()
+        self._sumw[...] = self._sumw * that
+        self._sumw2 *= np.square(that)
+        return self
+
+    def __itruediv__(self, that):
+        """In-place (true) division by a number."""
+        if np.ndim(that) != 0 or isinstance(that, (Histogram,
+                                                   SparseHistogram)):
+            return NotImplemented
+        self._compact_pending()
+        self._sumw[...] = self._sumw / that
+        self._sumw2 /= np.square(that)
+        return self
+
+    def __add__(self, that):
+        """Addition. The result is dense if `that` is a
+        :py:class:`Histogram`."""
+        if isinstance(that, Histogram):
+            return self.todense() + that
+        ret = self.copy()
+        return ret.__iadd__(that)
+
+    def __radd__(self, that):
+        """Commuting addition. Zero is the identity so that :py:func:`sum`
+        can be used on a list of histograms."""
+        if (not isinstance(that, (Histogram, SparseHistogram)) and
+                np.ndim(that) == 0 and that == 0):
+            return self.copy()
+        return self + that
+
+    def __sub__(self, that):
+        """Subtraction. The result is dense if `that` is a
+        :py:class:`Histogram`."""
+        if isinstance(that, Histogram):
+            return self.todense() - that
+        ret = self.copy()
+        return ret.__isub__(that)
+
+    def __mul__(self, that):
+        """Multiplication by a number."""
+        ret = self.copy(np.float64)
+        return ret.__imul__(that)
+
+    def __rmul__(self, that):
+        """Commuting multiplication."""
+        return self * that
+
+    def __truediv__(self, that):
+        """(True) division by a number."""
+        ret = self.copy(np.float64)
+        return ret.__itruediv__(that)
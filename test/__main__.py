@@ -8,6 +8,8 @@ from .serialization.test_histogram_root import *
 from .serialization.test_serialization import *
 from .test_histogram import *
 from .test_histogram_axis import *
+from .test_parallel import *
 from .test_run_control import *
+from .test_sparse_histogram import *
 
 main()
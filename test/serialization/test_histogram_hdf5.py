@@ -6,7 +6,7 @@ import unittest
 
 from tempfile import NamedTemporaryFile
 
-from histogram import Histogram, save_histograms, load_histograms
+from histogram import Histogram, TransformedAxis, IntegerAxis, CategoryAxis, save_histograms, load_histograms
 import histogram
 
 
@@ -119,6 +119,40 @@ class TestSerializationHDF5(unittest.TestCase):
         finally:
             os.remove(ftmp.name)
 
+    def test_transformed_axis(self):
+        ftmp = NamedTemporaryFile(suffix='.h5', delete=False)
+        try:
+            ftmp.close()
+            h = Histogram(TransformedAxis(4, [1, 1e4], 'log', 'E'),
+                          TransformedAxis(2, [0, 4], 'sqrt'), flow=True)
+            h.fill([2, 50, 5000], [1, 2, 3])
+            h.save(ftmp.name)
+            htmp = Histogram.load(ftmp.name)
+            self.assertTrue(h.isidentical(htmp))
+            for ax in htmp.axes:
+                self.assertIsInstance(ax, TransformedAxis)
+            self.assertEqual(htmp.axes[0].transform, 'log')
+
+        finally:
+            os.remove(ftmp.name)
+
+    def test_category_axes(self):
+        ftmp = NamedTemporaryFile(suffix='.h5', delete=False)
+        try:
+            ftmp.close()
+            h = Histogram(CategoryAxis(['e', 'μ', 'τ'], 'lepton'),
+                          IntegerAxis(-1, 2), CategoryAxis([17, 3]))
+            h.fill(['μ', 'e'], [0, 1], [3, 3])
+            h.save(ftmp.name)
+            htmp = Histogram.load(ftmp.name)
+            self.assertTrue(h.isidentical(htmp))
+            self.assertEqual(htmp.axes[0].categories.tolist(), ['e', 'μ', 'τ'])
+            self.assertIsInstance(htmp.axes[1], IntegerAxis)
+            self.assertEqual(htmp.axes[2].categories.tolist(), [17, 3])
+
+        finally:
+            os.remove(ftmp.name)
+
 
 if __name__ == '__main__':
     from .. import main
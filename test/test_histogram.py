@@ -2,13 +2,22 @@
 from __future__ import division
 
 from copy import copy, deepcopy
+from tempfile import TemporaryDirectory
 import numpy as np
+import os
 import unittest
 import warnings
 
 from numpy.testing import assert_array_almost_equal, assert_array_equal
 
-from histogram import Histogram, HistogramAxis
+from uncertainties import ufloat, unumpy as unp
+
+from histogram import (Histogram, HistogramAxis, UniformAxis, IntegerAxis,
+                       CategoryAxis, rc)
+
+
+def _line(x, a, b):
+    return a * x + b
 
 
 class TestHistogram(unittest.TestCase):
@@ -109,6 +118,45 @@ class TestHistogram(unittest.TestCase):
         del h.uncert
         assert_array_almost_equal(h.uncert, [np.nan, 0, 0])
 
+    def test_uncert_follows_data(self):
+        h = Histogram(3, [0, 1], data=[1, 4, 9])
+        assert_array_almost_equal(h.uncert, [1, 2, 3])
+        self.assertTrue(h.uncert.flags.writeable)
+
+        # modified through references to the data
+        d = h.data
+        assert_array_almost_equal(h.uncert, [1, 2, 3])
+        d[0] = 16
+        assert_array_almost_equal(h.uncert, [4, 2, 3])
+        arr = np.zeros(3)
+        h2 = Histogram(3, [0, 1], data=arr)
+        assert_array_almost_equal(h2.uncert, [0, 0, 0])
+        arr[:] = 4
+        assert_array_almost_equal(h2.uncert, [2, 2, 2])
+        h3 = Histogram(2, [0, 1], 3, [0, 1], data=np.ones((2, 3)))
+        s = next(h3.slices(0))
+        assert_array_almost_equal(s.uncert, [1, 1, 1])
+        h3.data[0] = 9
+        assert_array_almost_equal(s.uncert, [3, 3, 3])
+
+        h.fill(0.5)
+        assert_array_almost_equal(h.uncert, [4, np.sqrt(5), 3])
+        h += h
+        assert_array_almost_equal(h.uncert, np.sqrt([32, 10, 18]))
+
+        h.uncert = [1, 1, 1]
+        assert_array_almost_equal(h.uncert, [1, 1, 1])
+
+        # weighted storage, modified through a reference to the variance
+        h = Histogram(3, [0, 1], storage='weighted', dtype=np.float64)
+        h.fill([0.1, 0.5], [2, 3])
+        v = h.variance
+        assert_array_almost_equal(h.uncert, [2, 3, 0])
+        v[0] = 100
+        assert_array_almost_equal(h.uncert, [10, 3, 0])
+        h.fill(0.5, 4)
+        assert_array_almost_equal(h.uncert, [10, 5, 0])
+
     def test_uncert_ratio(self):
         h = Histogram(4, [0,1])
         h.data = [-1, 0, 1, 2]
@@ -235,6 +283,98 @@ class TestHistogram(unittest.TestCase):
         self.assertAlmostEqual(h1(5),15)
         self.assertAlmostEqual(h1(20, overflow_value=50), 50)
 
+    def test_call_arrays(self):
+        h = Histogram(10, [0, 10], 9, [-10, -1], dtype=np.float64)
+        h.data = np.arange(90).reshape(10, 9)
+        x = np.random.uniform(-1, 11, 1000)
+        y = np.random.uniform(-11, 0, 1000)
+        expected = [h(a, b, overflow_value=-1) for a, b in zip(x, y)]
+        assert_array_equal(h(x, y, overflow_value=-1), expected)
+        assert_array_equal(h(x, y, overflow_value=-1, chunksize=7), expected)
+
+        v = h([[0.5], [3.5]], [-9.5, -8.5, -20])
+        assert_array_equal(v, [[0, 1, 0], [27, 28, 0]])
+        v, u = h(x, y, uncert=True)
+        inside = (0 <= x) & (x < 10) & (-10 <= y) & (y < -1)
+        assert_array_almost_equal(u[inside], np.sqrt(v[inside]))
+        assert_array_equal(u[~inside], 0)
+        self.assertEqual(h(3.5, -8.5, uncert=True), (28, np.sqrt(28)))
+        self.assertTrue(np.isnan(Histogram(2, [0, 1])([5], overflow_value=np.nan)))
+        if __debug__:
+            with self.assertRaises(ValueError):
+                h(x)
+
+    def test_interpolator(self):
+        h = Histogram(4, [0, 4], 3, [0, 3], dtype=np.float64)
+        h.data = np.arange(12).reshape(4, 3)
+        f = h.interpolator()
+        self.assertIs(h.interpolator(), f)
+        assert_array_almost_equal(f([0.5, 1, 2.25], [0.5, 1.5, 2.5]),
+                                  [0, 2.5, 7.25])
+        assert_array_almost_equal(f([[0.5], [3.5]], [0.5, 2.5]),
+                                  [[0, 2], [9, 11]])
+        self.assertTrue(np.isnan(f(0.25, 1)))
+        self.assertEqual(h.interpolator(fill_value=-1)(4, 1), -1)
+        self.assertAlmostEqual(h.interpolator(fill_value=None)(4, 1), 9.5)
+
+        h.data *= 2
+        g = h.interpolator()
+        self.assertIsNot(g, f)
+        self.assertAlmostEqual(g(1, 1.5), 5)
+        self.assertIs(h.interpolator(), g)
+
+        # modified through a reference to the data
+        d = h.data
+        self.assertIs(h.interpolator(), g)
+        d[:] = 10
+        self.assertAlmostEqual(h.interpolator()(1.5, 1.5), 10)
+        self.assertAlmostEqual(g(1, 1.5), 5)
+        d[0, 0] = np.nan
+        f = h.interpolator()
+        self.assertIs(h.interpolator(), f)
+
+        h = Histogram(100, [0, 2 * np.pi], dtype=np.float64)
+        xx, = h.grid()
+        h.data = np.sin(xx)
+        x = np.linspace(1, 5, 101)
+        err_linear = np.abs(h.interpolator()(x) - np.sin(x)).max()
+        err_cubic = np.abs(h.interpolator('cubic')(x) - np.sin(x)).max()
+        self.assertLess(err_cubic, 1e-6)
+        self.assertLess(err_cubic, err_linear)
+        with self.assertRaises(ValueError):
+            h.interpolator('quintic')
+
+    def test_sample(self):
+        h = Histogram(4, [0, 4], 2, [0, 1], dtype=np.float64)
+        h.data = [[1, 0], [0, 2], [0, 0], [3, 4]]
+        s = h.sample(100000, rng=1, chunksize=30000)
+        self.assertEqual(s.shape, (2, 100000))
+        assert_array_equal(s, h.sample(100000, rng=1, chunksize=30000))
+        toy = Histogram(4, [0, 4], 2, [0, 1])
+        toy.fill_from_sample(s)
+        self.assertEqual(toy.data.sum(), 100000)
+        self.assertTrue(np.all(toy.data[h.data == 0] == 0))
+        assert_array_almost_equal(toy.data / 100000, h.data / 10, 2)
+
+        # the cumulative table is reused until the data changes
+        f = h.interpolator()
+        cdf = h._sample_cdf[1]
+        h.sample(10)
+        self.assertIs(h._sample_cdf[1], cdf)
+        self.assertIs(h.interpolator(), f)
+        h.fill(3.5, 0.5)
+        h.sample(10)
+        self.assertIsNot(h._sample_cdf[1], cdf)
+        self.assertEqual(h._sample_cdf[1][-1], 11)
+
+        h = Histogram(IntegerAxis(2, 5), CategoryAxis(['a', 'b']),
+                      data=[[1, 0], [0, 0], [0, 3]])
+        x, c = h.sample(100, rng=np.random.RandomState(2))
+        self.assertEqual(set(zip(x, c)), {(2, 'a'), (4, 'b')})
+
+        with self.assertRaises(ValueError):
+            Histogram(3, [0, 1]).sample(10)
+
     def test_asdict(self):
         h = Histogram(3,[0,3],'xx','ll','tt',data=[5,6,7])
         d = h.asdict()
@@ -333,6 +473,13 @@ class TestHistogram(unittest.TestCase):
         assert_array_almost_equal(h.edges[0], [0,1,2])
         assert_array_almost_equal(h.edges[1], [-1,0,1])
 
+        # the edges of a uniform axis can be replaced by non-uniform ones
+        h = Histogram(3, [0, 3])
+        h.axes[0].edges = [0, 1, 2, 5]
+        assert_array_almost_equal(h.edges[0], [0, 1, 2, 5])
+        h.fill([0.5, 4, 6])
+        assert_array_equal(h.data, [1, 0, 1])
+
     def test_grid(self):
         h = Histogram([0,1,2])
         self.assertEqual(len(h.grid()), 1)
@@ -876,6 +1023,303 @@ class TestHistogram(unittest.TestCase):
                       [0,0,0,3,4,0,0,0,0,0],
                       [0,0,0,0,0,5,0,0,0,0]]))
 
+    def test_fill_from_sample_histogramdd(self):
+        np.random.seed(1)
+        for edges in [np.linspace(0, 10, 101), np.logspace(0, 1, 30)]:
+            for dim in [1, 2, 3]:
+                sample = np.random.normal(5, 4, (dim, 10000))
+                sample[:, :10] = np.nan
+                sample[:, 10:20] = edges[-1]
+                sample[:, 20:30] = edges[0]
+                weights = np.random.uniform(0, 1, 10000)
+
+                h = Histogram(*([edges] * dim))
+                h.fill_from_sample(sample)
+                expected, _ = np.histogramdd(sample.T, [edges] * dim)
+                assert_array_equal(h.data, expected)
+
+                h = Histogram(*([edges] * dim), dtype=np.float64)
+                h.fill_from_sample(sample, weights)
+                expected, _ = np.histogramdd(sample.T, [edges] * dim,
+                                             weights=weights)
+                assert_array_almost_equal(h.data, expected)
+
+    def test_fill_threads(self):
+        np.random.seed(1)
+        sample = np.random.normal(5, 2, (2, 10001))
+        weights = np.random.uniform(0, 1, 10001)
+        chunksize = rc.fill.chunksize
+        rc.fill.chunksize = 1000
+        try:
+            for wt in [None, 2, weights]:
+                h1 = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64)
+                h1.fill_from_sample(sample, wt)
+                h2 = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64)
+                h2.fill_from_sample(sample, wt, threads=3)
+                assert_array_almost_equal(h1.data, h2.data)
+            h3 = Histogram(10, [0, 10], 20, [0, 10])
+            h3.fill(sample[0], sample[1], threads=4)
+            expected, _ = np.histogramdd(sample.T, h3.edges)
+            assert_array_equal(h3.data, expected)
+
+            # fewer points than threads
+            for storage in ['default', 'weighted']:
+                h4 = Histogram(10, [0, 10], 20, [0, 10], storage=storage,
+                               dtype=np.float64)
+                h4.fill_from_sample(np.zeros((2, 0)), threads=2)
+                h4.fill_from_sample(sample[:, :1], weights[:1], threads=2)
+                self.assertAlmostEqual(h4.data.sum(), weights[0])
+        finally:
+            rc.fill.chunksize = chunksize
+
+    def test_fill_iter(self):
+        np.random.seed(1)
+        sample = np.random.normal(5, 2, (2, 1000))
+        weights = np.random.uniform(0, 1, 1000)
+        expected = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64)
+        expected.fill_from_sample(sample, weights)
+
+        h = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64)
+        progress = []
+        n = h.fill_iter((sample[:, i:i+100] for i in range(0, 1000, 100)),
+                        (weights[i:i+100] for i in range(0, 1000, 100)),
+                        callback=progress.append)
+        self.assertEqual(n, 1000)
+        self.assertEqual(progress, list(range(100, 1001, 100)))
+        assert_array_almost_equal(h.data, expected.data)
+
+        h = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64)
+        progress = []
+        n = h.fill_iter(iter(sample.T), iter(weights), chunksize=300,
+                        callback=progress.append)
+        self.assertEqual(n, 1000)
+        self.assertEqual(progress, [300, 600, 900, 1000])
+        assert_array_almost_equal(h.data, expected.data)
+
+        h = Histogram(10, [0, 10])
+        n = h.fill_iter([[1, 2], 3, [3, 3]], 2, chunksize=2)
+        self.assertEqual(n, 5)
+        assert_array_equal(h.data, [0, 2, 2, 6, 0, 0, 0, 0, 0, 0])
+
+        with self.assertRaises(ValueError):
+            h.fill_iter([[1, 2], [3]], iter([[1, 1]]))
+
+    def test_fill_indices(self):
+        np.random.seed(1)
+        sample = np.random.normal(5, 3, (2, 1000))
+        weights = np.random.uniform(0, 2, (3, 1000))
+        h = Histogram(10, [0, 10], 5, [0, 10], dtype=np.float64,
+                      storage='weighted')
+        indices = h.compute_bin_indices(sample)
+        self.assertEqual(indices.shape, (1000,))
+        for w in list(weights) + [None, 2]:
+            h1 = h.copy()
+            h2 = h.copy()
+            h1.fill_from_sample(sample, w)
+            h2.fill_indices(indices, w)
+            self.assertTrue(h1.isidentical(h2))
+
+        hflow = Histogram(10, [0, 10], 5, [0, 10], flow=True)
+        hflow.fill_indices(hflow.compute_bin_indices(sample))
+        self.assertEqual(hflow.flow_data.sum(), 1000)
+
+        if __debug__:
+            with self.assertRaises(ValueError):
+                h.fill_indices(hflow.compute_bin_indices(sample))
+
+    def test_fill_variations(self):
+        np.random.seed(1)
+        sample = np.random.normal(5, 3, (2, 1000))
+        weights = np.random.uniform(0, 2, (4, 1000))
+        for kwargs in [{}, {'storage': 'weighted'}, {'flow': True}]:
+            h = Histogram(10, [0, 10], 5, [0, 10], 4, [0, 4], 'variation',
+                          dtype=np.float64, **kwargs)
+            h.fill(sample[0], sample[1], weights=weights)
+            for w, hvar in zip(weights, h.slices(2)):
+                hw = Histogram(10, [0, 10], 5, [0, 10], dtype=np.float64,
+                               **kwargs)
+                hw.fill_from_sample(sample, w)
+                assert_array_almost_equal(hvar.flow_data, hw.flow_data)
+                if h.storage == 'weighted':
+                    assert_array_almost_equal(hvar.variance, hw.variance)
+
+        with self.assertRaises(ValueError):
+            h.fill_from_sample(sample, weights[:3])
+
+    def test_fill_one_buffered(self):
+        np.random.seed(1)
+        sample = np.random.normal(5, 3, (2, 1000))
+        weights = np.random.uniform(0, 2, 1000)
+        h1 = Histogram(10, [0, 10], 5, [0, 10], dtype=np.float64,
+                       storage='weighted')
+        h2 = h1.copy()
+        for pt, w in zip(sample.T, weights):
+            h1.fill_one(pt, w)
+        with h2.buffered(size=300):
+            for pt, w in zip(sample.T[:500], weights[:500]):
+                h2.fill_one(pt, w)
+            # reading the data flushes the buffer
+            hpart = h1.copy()
+            hpart.reset()
+            hpart.fill_from_sample(sample[:, :500], weights[:500])
+            assert_array_almost_equal(h2.data, hpart.data)
+            for pt, w in zip(sample.T[500:], weights[500:]):
+                h2.fill_one(pt, w)
+        self.assertTrue(h1.isidentical(h2))
+
+        h3 = Histogram(10, [0, 10], 5, [0, 10])
+        with h3.buffered():
+            for pt in sample.T:
+                h3.fill_one(pt)
+            self.assertEqual(h3.data.dtype, np.int64)
+        h4 = Histogram(10, [0, 10], 5, [0, 10])
+        h4.fill_from_sample(sample)
+        self.assertTrue(h3.isidentical(h4))
+
+        # setting the data replaces the buffered entries
+        h = Histogram(2, [0, 1])
+        with h.buffered():
+            h.fill_one(0.25)
+            h.data = 0
+            h.fill_one(0.75)
+        assert_array_equal(h.data, [0, 1])
+        with h.buffered():
+            h.fill_one(0.25)
+            h._set_flow_data(np.zeros(2, dtype=h.data.dtype))
+        assert_array_equal(h.data, [0, 0])
+
+    def test_fill_from_dataset(self):
+        np.random.seed(1)
+        table = np.random.normal(5, 2, (1000, 4))
+        expected = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64)
+        expected.fill_from_sample(table[:, [2, 0]].T, table[:, 3])
+
+        with TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, 'table.npy')
+            np.save(filepath, table)
+            mm = np.load(filepath, mmap_mode='r')
+
+            h = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64)
+            n = h.fill_from_dataset(mm, columns=[2, 0], weight_column=3,
+                                    blocksize=128)
+            self.assertEqual(n, 1000)
+            assert_array_almost_equal(h.data, expected.data)
+
+            h = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64)
+            h.fill_from_dataset(mm, columns=[2, 0], weights=mm[:, 3],
+                                blocksize=300)
+            assert_array_almost_equal(h.data, expected.data)
+
+            h = Histogram(10, [0, 10], 20, [0, 10])
+            h.fill_from_dataset(mm, blocksize=300)
+            expected, _ = np.histogramdd(table[:, :2], h.edges)
+            assert_array_equal(h.data, expected)
+
+            h = Histogram(10, [0, 10])
+            h.fill_from_dataset(mm[:, 1], weights=2, blocksize=300)
+            expected, _ = np.histogram(table[:, 1], h.axes[0].edges)
+            assert_array_equal(h.data, 2 * expected)
+
+    def test_fill_from_dataset_structured(self):
+        np.random.seed(1)
+        table = np.empty(1000, dtype=[('x', float), ('y', float),
+                                      ('w', float)])
+        for k in table.dtype.names:
+            table[k] = np.random.normal(5, 2, 1000)
+        expected = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64)
+        expected.fill_from_sample((table['y'], table['x']), table['w'])
+
+        h = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64)
+        h.fill_from_dataset(table, columns=['y', 'x'], weight_column='w',
+                            blocksize=128)
+        assert_array_almost_equal(h.data, expected.data)
+
+    def test_storage_weighted(self):
+        h = Histogram(10, [0, 10], dtype=np.float64, storage='weighted')
+        self.assertEqual(h.storage, 'weighted')
+        self.assertTrue(h.has_uncert)
+        assert_array_equal(h.variance, np.zeros(10))
+
+        h.fill([1, 1, 2], [0.5, 0.5, 2])
+        h.fill([3, 3], 3)
+        h.fill(4)
+        h.fill_one(5, 2)
+        assert_array_almost_equal(h.data, [0, 1, 2, 6, 1, 2, 0, 0, 0, 0])
+        assert_array_almost_equal(h.variance,
+                                  [0, 0.5, 4, 18, 1, 4, 0, 0, 0, 0])
+        assert_array_almost_equal(h.uncert, np.sqrt(h.variance))
+
+        h.variance[1] = 9
+        self.assertAlmostEqual(h.uncert[1], 3)
+        h.uncert = np.ones(10)
+        assert_array_almost_equal(h.variance, np.ones(10))
+
+        h.reset()
+        assert_array_equal(h.variance, np.zeros(10))
+
+        h = Histogram(3, [0, 3], data=[1, 2, 3], storage='weighted')
+        assert_array_almost_equal(h.variance, [1, 2, 3])
+
+        with self.assertRaises(ValueError):
+            Histogram(3, [0, 3], storage='unknown')
+        with self.assertRaises(ValueError):
+            Histogram(3, [0, 3], variance=[1, 2, 3], storage='default')
+
+    def test_storage_weighted_fill_threads(self):
+        np.random.seed(1)
+        sample = np.random.normal(5, 2, (2, 10001))
+        weights = np.random.uniform(0, 1, 10001)
+        h1 = Histogram(10, [0, 10], 20, [0, 10], dtype=np.float64,
+                       storage='weighted')
+        h1.fill_from_sample(sample, weights)
+        h2 = h1.copy()
+        h2.reset()
+        h2.fill_from_sample(sample, weights, threads=3)
+        expected, _ = np.histogramdd(sample.T, h1.edges, weights=weights**2)
+        assert_array_almost_equal(h1.variance, expected)
+        assert_array_almost_equal(h2.variance, expected)
+
+    def test_storage_weighted_propagation(self):
+        h1 = Histogram(2, [0, 2], 3, [0, 3], data=[[1, 2, 3], [4, 5, 6]],
+                       variance=[[1, 1, 1], [2, 2, 2]], dtype=np.float64)
+        h2 = Histogram(2, [0, 2], 3, [0, 3], data=[[1, 1, 1], [2, 2, 2]],
+                       variance=[[1, 2, 3], [1, 2, 3]], dtype=np.float64)
+
+        h = h1 + h2
+        self.assertEqual(h.storage, 'weighted')
+        assert_array_almost_equal(h.variance, [[2, 3, 4], [3, 4, 5]])
+        h = h1 - h2
+        assert_array_almost_equal(h.variance, [[2, 3, 4], [3, 4, 5]])
+        h = h1 * 2
+        assert_array_almost_equal(h.variance, [[4, 4, 4], [8, 8, 8]])
+        h = h1 / h2
+        assert_array_almost_equal(h.variance,
+            h1.variance / h2.data**2 +
+            h1.data**2 * h2.variance / h2.data**4)
+
+        h = h1.sum(0)
+        self.assertEqual(h.storage, 'weighted')
+        assert_array_almost_equal(h.variance, [3, 3, 3])
+        s = h1.sum()
+        self.assertAlmostEqual(s.n, 21)
+        self.assertAlmostEqual(s.s, 3)
+
+        h = h1.rebin(3, axis=1)
+        self.assertEqual(h.storage, 'weighted')
+        assert_array_almost_equal(h.variance, [[3], [6]])
+
+        h = h1.cut(1, 3, axis=1)
+        self.assertEqual(h.storage, 'weighted')
+        assert_array_almost_equal(h.variance, [[1, 1], [2, 2]])
+
+        for h, v in zip(h1.slices(0), h1.variance):
+            self.assertEqual(h.storage, 'weighted')
+            assert_array_almost_equal(h.variance, v)
+
+        h = Histogram.fromdict(h1.asdict())
+        self.assertEqual(h.storage, 'weighted')
+        assert_array_almost_equal(h.variance, h1.variance)
+
     def test_copy(self):
         h = Histogram(3, [0, 3], 10, [0, 10])
         xdata = [0, 0, 1, 1, 2]
@@ -1089,6 +1533,171 @@ class TestHistogram(unittest.TestCase):
         h = 2 / h1
         assert_array_almost_equal(h.data, [2.0, 1.0, 0.666666666667])
 
+    def test_arithmetic_uncert_unumpy(self):
+        np.random.seed(1)
+        h1 = Histogram(4, [0, 1], 3, [0, 1],
+                       data=np.random.uniform(-5, 5, (4, 3)),
+                       uncert=np.random.uniform(0, 2, (4, 3)))
+        h2 = Histogram(4, [0, 1], 3, [0, 1],
+                       data=np.random.uniform(1, 5, (4, 3)),
+                       uncert=np.random.uniform(0, 2, (4, 3)))
+        a = unp.uarray(h1.data, h1.uncert)
+        b = unp.uarray(h2.data, h2.uncert)
+        c = ufloat(2, 0.3)
+        d = np.random.uniform(1, 5, (4, 3))
+        for op in [lambda x, y: x + y,
+                   lambda x, y: x - y,
+                   lambda x, y: x * y,
+                   lambda x, y: x / y]:
+            for hthat, uthat in [(h2, b), (2.5, 2.5), (c, c), (d, d)]:
+                h = op(h1, hthat)
+                expected = op(a, uthat)
+                assert_array_almost_equal(h.data, unp.nominal_values(expected))
+                assert_array_almost_equal(h.uncert, unp.std_devs(expected))
+
+    def test_reversed_arithmetic_array(self):
+        np.random.seed(1)
+        h1 = Histogram(4, [0, 1], 3, [0, 1],
+                       data=np.random.uniform(1, 5, (4, 3)),
+                       uncert=np.random.uniform(0, 2, (4, 3)))
+        a = unp.uarray(h1.data, h1.uncert)
+        d = np.random.uniform(1, 5, (4, 3))
+        e = unp.uarray(np.random.uniform(1, 5, (4, 1)),
+                       np.random.uniform(0, 2, (4, 1)))
+        for op, rop in [(lambda x, y: x - y, Histogram.__rsub__),
+                        (lambda x, y: x / y, Histogram.__rtruediv__)]:
+            for that in [2.5, d, d[:, :1], e]:
+                h = rop(h1, that)
+                expected = op(that, a)
+                assert_array_almost_equal(h.data, unp.nominal_values(expected))
+                assert_array_almost_equal(h.uncert, unp.std_devs(expected))
+
+    def test_merge(self):
+        np.random.seed(1)
+        hists = []
+        for i in range(7):
+            h = Histogram(10, [0, 10], 5, [0, 10], flow=True)
+            h.fill_from_sample(np.random.normal(5, 3, (2, 100)))
+            hists.append(h)
+        expected = sum(hists[1:], hists[0])
+        for threads in [1, 3]:
+            h = Histogram.merge(iter(hists), threads=threads)
+            self.assertTrue(h.isidentical(expected))
+            self.assertEqual(h.data.dtype, hists[0].data.dtype)
+            self.assertFalse(h.has_uncert)
+
+        hists[2].uncert = np.random.uniform(1, 2, hists[2].shape)
+        expected = sum(hists[1:], hists[0])
+        for threads in [1, 4]:
+            h = Histogram.merge(hists, threads=threads, dtype=np.float64)
+            self.assertTrue(h.isidentical(expected))
+
+        weighted = [Histogram(10, [0, 10], 5, [0, 10], storage='weighted',
+                              dtype=np.float64) for _ in range(3)]
+        for h in weighted:
+            h.fill_from_sample(np.random.normal(5, 3, (2, 100)),
+                               np.random.uniform(0, 2, 100))
+        h = Histogram.merge(weighted, threads=2)
+        self.assertEqual(h.storage, 'weighted')
+        self.assertTrue(h.isidentical(sum(weighted[1:], weighted[0])))
+
+        # integer and floating point data
+        mixed = [Histogram(2, [0, 1], data=[1, 2]),
+                 Histogram(2, [0, 1], data=[0.5, 0.25], dtype=np.float64),
+                 Histogram(2, [0, 1], data=[3, 4])]
+        for threads in [1, 2]:
+            h = Histogram.merge(mixed, threads=threads)
+            self.assertEqual(h.data.dtype, np.float64)
+            assert_array_almost_equal(h.data, sum(mixed).data)
+        h = Histogram.merge(mixed, dtype=np.int64)
+        assert_array_equal(h.data, [4, 6])
+
+        with self.assertRaises(ValueError):
+            Histogram.merge([])
+        with self.assertRaises(ValueError):
+            Histogram.merge([hists[0], Histogram(10, [0, 10], 5, [0, 10])])
+        if __debug__:
+            with self.assertRaises(ValueError):
+                Histogram.merge([hists[0], Histogram(10, [0, 10], 5, [0, 1],
+                                                     flow=True)])
+
+    def test_growth(self):
+        np.random.seed(1)
+        sample = np.random.normal(0, 3, (2, 10000))
+        weights = np.random.uniform(0, 2, 10000)
+        h = Histogram(UniformAxis(10, [0, 1], growth=True), 5, [0, 5],
+                      storage='weighted', dtype=np.float64, flow=True)
+        self.assertFalse(h.axes[0].flow)
+        self.assertTrue(h.axes[1].flow)
+        for i in range(0, 10000, 100):
+            h.fill(*(list(sample[:, i:i + 100]) + [weights[i:i + 100]]))
+        ax = h.axes[0]
+        self.assertTrue(ax.growth)
+        self.assertLessEqual(ax.min, sample[0].min())
+        self.assertGreaterEqual(ax.max, sample[0].max())
+        self.assertAlmostEqual(ax.binwidth(), 0.1)
+        self.assertAlmostEqual(h.flow_data.sum(), weights.sum())
+
+        expected = Histogram(ax, 5, [0, 5], storage='weighted',
+                             dtype=np.float64, flow=True)
+        expected.fill(*(list(sample) + [weights]))
+        self.assertTrue(h.isidentical(expected))
+
+        h = Histogram(UniformAxis(2, [0, 1], growth=True), data=[1, 2])
+        with h.buffered(3):
+            for x in [0.2, -0.4, 1.3, np.nan, np.inf]:
+                h.fill_one(x)
+        h.fill_one(3)
+        assert_array_equal(h.axes[0].edges, np.linspace(-0.5, 3, 8))
+        assert_array_equal(h.data, [1, 2, 2, 1, 0, 0, 1])
+
+        h = Histogram(UniformAxis(1, [0, 1], growth=True))
+        for x in range(100):
+            h.fill(x + 0.5)
+        self.assertEqual(h.axes[0].limits, (0, 100))
+        assert_array_equal(h.data, 1)
+
+    def test_categories(self):
+        h = Histogram(CategoryAxis(['e', 'mu', 'tau']), IntegerAxis(1, 4),
+                      flow=True)
+        h.fill(['mu', 'e', 'mu', 'pi', 'tau'], [1, 2, 3, 3, 7])
+        h.fill_one(('tau', 2))
+        assert_array_equal(h.data, [[0, 1, 0], [1, 0, 1], [0, 1, 0]])
+        self.assertEqual(h.flow_data[-1, 3], 1)
+        self.assertEqual(h.flow_data[3, -1], 1)
+        self.assertEqual(h('mu', 3), 1)
+        self.assertEqual(h('pi', 3), 0)
+        assert_array_equal(h.projection(0).data, [1, 2, 1])
+        assert_array_equal(h.projection(1).data, [1, 2, 1])
+
+        c = h.cut('mu', 'tau')
+        self.assertEqual(c.axes[0].categories.tolist(), ['mu', 'tau'])
+        assert_array_equal(c.data, [[1, 0, 1], [0, 1, 0]])
+        self.assertEqual(c.flow_data.sum(), h.flow_data.sum())
+        c = h.cut((None, None), (2, 2))
+        assert_array_equal(c.data, [[1], [0], [1]])
+
+        # a category equal to the upper limit of the axis
+        h1 = Histogram(CategoryAxis([1.5, 10.0]))
+        h2 = Histogram(CategoryAxis([1.5, 10.0]))
+        for x in [1.5, 10.0]:
+            h1.fill_one(x)
+            h2.fill([x])
+        assert_array_equal(h1.data, [1, 1])
+        assert_array_equal(h1.data, h2.data)
+
+        # buffered points are binned as categories on flush
+        h3 = Histogram(CategoryAxis(['e', 'mu', 'tau']), IntegerAxis(1, 4),
+                       flow=True)
+        with h3.buffered():
+            for pt in zip(['mu', 'e', 'mu', 'pi', 'tau', 'tau'],
+                          [1, 2, 3, 3, 7, 2]):
+                h3.fill_one(pt)
+        self.assertTrue(h3.isidentical(h))
+        with h1.buffered():
+            h1.fill_one(10.0)
+        assert_array_equal(h1.data, [1, 2])
+
     def test_interpolate_nonfinites_1d(self):
         h = Histogram(5,[0,1],data=[1,2,np.nan,4,5],dtype=np.float64)
         h.interpolate_nonfinites()
@@ -1271,6 +1880,28 @@ class TestHistogram(unittest.TestCase):
         hrebin = h.rebin(3)
         self.assertTrue(hrebin.isidentical(hexpect))
 
+    def test_rebin_1d_snap_high(self):
+        h = Histogram(5,[0,5])
+        h.data = [1,2,3,4,5]
+        hexpect = Histogram(2,[1,5])
+        hexpect.data = [5,9]
+        hrebin = h.rebin(2, snap='high')
+        self.assertTrue(hrebin.isidentical(hexpect))
+
+    def test_rebin_1d_noclip_remainder(self):
+        h = Histogram(10,[0,10])
+        h.set(1)
+
+        hexpect = Histogram([0,4,8,10])
+        hexpect.data = [4,4,2]
+        hrebin = h.rebin(4, snap='low', clip=False)
+        self.assertTrue(hrebin.isidentical(hexpect))
+
+        hexpect = Histogram([0,2,6,10])
+        hexpect.data = [2,4,4]
+        hrebin = h.rebin(4, snap='high', clip=False)
+        self.assertTrue(hrebin.isidentical(hexpect))
+
     def test_rebin_2d(self):
         h = Histogram(3,[0,3],6,[0,6])
         h.set(1)
@@ -1383,6 +2014,50 @@ class TestHistogram(unittest.TestCase):
         h3a = h3.cut(-30,30,axis=0)
         h3b = h3.cut(270,330,axis=0)
 
+    def test_flow(self):
+        h = Histogram(4, [0, 4], flow=True)
+        self.assertTrue(h.has_flow)
+        h.fill([-1, 0, 1, 4, 5, 6, np.nan])
+        h.fill_one(-2)
+        assert_array_equal(h.data, [1, 1, 0, 1])
+        assert_array_equal(h.flow_data, [2, 1, 1, 0, 1, 3])
+        self.assertTrue(eval(repr(h)).isidentical(h))
+
+        r = h.rebin(3)
+        assert_array_almost_equal(r.axes[0].edges, [0, 3])
+        assert_array_equal(r.flow_data, [2, 2, 4])
+        r = h.rebin(3, snap='high')
+        assert_array_equal(r.flow_data, [3, 2, 3])
+        c = h.cut(1, 2)
+        assert_array_equal(c.flow_data, [3, 1, 4])
+
+        h2 = h + h
+        assert_array_equal(h2.flow_data, 2 * h.flow_data)
+
+        np.random.seed(1)
+        sample = np.random.uniform(-1, 5, (2, 1000))
+        weights = np.random.uniform(0, 2, 1000)
+        h = Histogram(4, [0, 4], 3, [0, 3], dtype=np.float64,
+                      storage='weighted', flow=True)
+        h.fill_from_sample(sample, weights)
+        self.assertEqual(h.flow_data.shape, (6, 5))
+        self.assertAlmostEqual(h.flow_data.sum(), weights.sum())
+        self.assertAlmostEqual(h.flow_variance.sum(), (weights**2).sum())
+        edges = [np.concatenate(([-np.inf], e, [np.inf])) for e in h.edges]
+        expected, _ = np.histogramdd(sample.T, edges, weights=weights)
+        assert_array_almost_equal(h.flow_data, expected)
+
+        hx = h.sum(1)
+        assert_array_almost_equal(hx.flow_data, expected[:, 1:-1].sum(1))
+        self.assertEqual(len(list(h.slices(0))), 4)
+
+        hc = h.cut((1, 3), (None, None))
+        self.assertAlmostEqual(hc.flow_data.sum(), weights.sum())
+
+        self.assertTrue(Histogram.fromdict(h.asdict()).isidentical(h))
+        self.assertTrue(
+            Histogram.fromdict(h.asdict(flat=True)).isidentical(h))
+
     def test_occupancy(self):
         h = Histogram(10,[0,10])
         h.fill([1,1,1,2,2,2,3])
@@ -1491,6 +2166,70 @@ class TestHistogram(unittest.TestCase):
 
         self.assertEqual(len(h.fit(poly, [1,1], test=None)), 2)
 
+    def test_fit_likelihood(self):
+        const = lambda x, a: a + 0 * x
+        const_jac = lambda x, a: np.ones((len(x), 1))
+        h = Histogram(6, [0, 6], data=[0, 1, 0, 3, 2, 0])
+        for jac in [None, const_jac]:
+            popt, pcov, ptest = h.fit(const, [2], likelihood='poisson',
+                                      jac=jac)
+            self.assertAlmostEqual(popt[0], 1, 5)
+            self.assertAlmostEqual(pcov[0, 0], 1 / 6, 5)
+            deviance = 2 * (6 - 6 + np.log(3 ** 3 * 2 ** 2))
+            self.assertAlmostEqual(ptest[0], deviance / 5, 5)
+
+        # least squares excludes the empty bins
+        popt = h.fit(const, [2], jac=const_jac, test='none')[0]
+        assert_array_almost_equal(popt, h.fit(const, [2], test='none')[0])
+        self.assertGreater(popt[0], 1)
+
+        # chi-square per degree of freedom of a 2D fit
+        np.random.seed(1)
+        plane = lambda xy, a, b: a + b * xy[0]
+        h = Histogram(10, [0, 1], 10, [0, 1])
+        xx, yy = h.grid()
+        h.data = np.random.poisson(50 + 20 * xx)
+        popt, pcov, ptest = h.fit(plane, [1, 1])
+        perr = np.sqrt(np.diag(pcov))
+        self.assertTrue(np.all(np.abs(popt - [50, 20]) < 5 * perr))
+        yyfit = plane((xx.ravel(), yy.ravel()), *popt)
+        chisq = np.sum(np.square(h.data.ravel() - yyfit) / yyfit)
+        self.assertAlmostEqual(ptest[0], chisq / 98)
+        self.assertGreater(ptest[1], 0.01)
+        with self.assertRaises(ValueError):
+            h.fit(lambda xy, a: a, [1], likelihood='gaussian')
+
+    def test_fit_slices(self):
+        warnings.simplefilter('ignore')
+        h = Histogram(6, [0, 6], 10, [0, 10], dtype=float)
+        xx, yy = h.grid()
+        h.data = (xx + 1) * yy + 2 * xx + 1
+        h.data[3] = 0
+        h.data[3, 0] = np.nan
+
+        expected = []
+        for hs in h.slices(0):
+            try:
+                expected.append(hs.fit(_line, [1, 1], test='none')[0])
+            except ValueError:
+                expected.append([np.nan, np.nan])
+        popt, pcov = h.fit_slices(_line, [1, 1], test='none')
+        assert_array_almost_equal(popt, expected)
+        self.assertEqual(pcov.shape, (6, 2, 2))
+
+        popt, pcov, ptest = h.fit_slices(_line, lambda hs: [1, 1], workers=3)
+        self.assertEqual(ptest.shape, (6, 2))
+        assert_array_almost_equal(popt[[0, 1, 2, 4, 5], 0],
+                                  [1.5, 2.5, 3.5, 5.5, 6.5])
+        assert_array_almost_equal(popt[[0, 1, 2, 4, 5], 1], [2, 4, 6, 10, 12])
+        popt2 = h.fit_slices(_line, [1, 1], 0, workers=2, processes=True)[0]
+        assert_array_almost_equal(popt2, popt)
+
+        popt = h.fit_slices(_line, [1, 1], axis=1)[0]
+        self.assertEqual(popt.shape, (10, 2))
+        with self.assertRaises(RuntimeError):
+            Histogram(2, [0, 1], 2, [0, 1]).fit_slices(_line, [1, 1, 1])
+
 
 
 if __name__ == '__main__':
@@ -7,7 +7,8 @@ import unittest
 
 from numpy.testing import assert_array_almost_equal, assert_array_equal
 
-from histogram import HistogramAxis
+from histogram import (HistogramAxis, UniformAxis, TransformedAxis,
+                       IntegerAxis, CategoryAxis)
 
 
 class TestHistogramAxis(unittest.TestCase):
@@ -185,6 +186,23 @@ class TestHistogramAxis(unittest.TestCase):
         self.assertEqual(a1.bin(9.9999999), 9)
         assert_array_equal(a1.bin(np.linspace(0.5, 9.5, 10)), range(10))
 
+    def test_bin_uniform(self):
+        edges = np.linspace(-3.3, 7.1, 1001)
+        a = HistogramAxis(edges)
+        x = np.concatenate([edges,
+                            np.nextafter(edges, np.inf),
+                            np.nextafter(edges, -np.inf),
+                            np.random.uniform(-5, 9, 1000),
+                            [np.nan, np.inf, -np.inf]])
+        assert_array_equal(a.bin(x),
+                           np.searchsorted(edges, x, side='right') - 1)
+
+        a = HistogramAxis(np.logspace(0, 1, 11))
+        self.assertFalse(a._arithmetic_binning())
+        x = np.linspace(0, 11, 100)
+        assert_array_equal(a.bin(x),
+                           np.searchsorted(a.edges, x, side='right') - 1)
+
     def test_edge_index(self):
         a = HistogramAxis(10, [0, 10])
         assert_array_almost_equal(a.edge_index(-1), 0)
@@ -383,6 +401,218 @@ class TestHistogramAxis(unittest.TestCase):
         b = HistogramAxis.fromdict(a.asdict())
         self.assertEqual(a, b)
 
+    def test_flow(self):
+        a = HistogramAxis(3, [0, 1], flow=True)
+        self.assertTrue(a.flow)
+        self.assertFalse(a.isidentical(HistogramAxis(3, [0, 1])))
+        self.assertTrue(HistogramAxis.fromdict(a.asdict()).isidentical(a))
+        self.assertTrue(eval(repr(a)).isidentical(a))
+        self.assertTrue(a.copy().flow)
+        self.assertTrue(a.mergebins(3).flow)
+        self.assertTrue(a.cut(0, 0.5).axis.flow)
+
+    def test_cache(self):
+        a = HistogramAxis([0, 1, 3, 6])
+        self.assertIsNot(a.binwidths(), a.binwidths())
+        assert_array_equal(a.binwidths(), [1, 2, 3])
+        assert_array_equal(a.bincenters(), [0.5, 2, 4.5])
+        self.assertFalse(a.isuniform())
+        self.assertTrue(a.isuniform(rtol=2))
+        # the returned arrays are writeable copies
+        w = a.binwidths()
+        w *= 2
+        c = a.bincenters()
+        c[0] = -1
+        assert_array_equal(a.binwidths(), [1, 2, 3])
+        assert_array_equal(a.bincenters(), [0.5, 2, 4.5])
+        b = a.copy()
+        a.edges = [0, 1, 2, 3]
+        assert_array_equal(a.binwidths(), [1, 1, 1])
+        assert_array_equal(a.bincenters(), [0.5, 1.5, 2.5])
+        self.assertTrue(a.isuniform())
+        assert_array_equal(b.binwidths(), [1, 2, 3])
+        if __debug__:
+            with self.assertRaises(ValueError):
+                a.edges = [0, 2, 2]
+            with self.assertRaises(ValueError):
+                a.edges = [0, np.nan, 2]
+
+    def test_shared_edges(self):
+        e = np.logspace(0, 2, 11)
+        a1 = HistogramAxis(e)
+        a2 = HistogramAxis(e.copy(), 'x')
+        self.assertIs(a1.edges, a2.edges)
+        self.assertIs(a1.copy().edges, a1.edges)
+        self.assertIsNot(HistogramAxis(e[:-1]).edges, a1.edges)
+        self.assertIsNot(HistogramAxis(e.astype(np.float32)).edges, a1.edges)
+        with self.assertRaises(ValueError):
+            a1.edges[0] = 0
+        e[0] = 0
+        self.assertEqual(a1.min, 1)
+        a2.edges = [0, 1, 2]
+        assert_array_equal(a1.edges, np.logspace(0, 2, 11))
+        self.assertTrue(a1 == a1.copy())
+
+    def test_uniform(self):
+        a = UniformAxis(7, [-1.3, 2.9], 'x')
+        b = HistogramAxis(7, [-1.3, 2.9], 'x')
+        self.assertEqual(a, b)
+        self.assertEqual(b, a)
+        self.assertTrue(a.isidentical(b))
+        self.assertIs(a.edges, a.edges)
+        self.assertFalse(a.edges.flags.writeable)
+        self.assertIs(a.edges, UniformAxis(7, [-1.3, 2.9]).edges)
+        self.assertTrue(eval(repr(a)).isidentical(a))
+        self.assertEqual((a.nbins, a.min, a.max), (7, -1.3, 2.9))
+        self.assertTrue(a.isuniform())
+        self.assertAlmostEqual(a.binwidth(3), b.binwidth(3))
+        assert_array_almost_equal(a.binwidths(), b.binwidths())
+        assert_array_almost_equal(a.bincenters(), b.bincenters())
+        self.assertNotEqual(a, UniformAxis(7, [-1.3, 3]))
+
+        x = np.concatenate([b.edges, np.random.uniform(-2, 4, 1000),
+                            [np.nan, np.inf, -np.inf]])
+        assert_array_equal(a.bin(x), b.bin(x))
+        for xx in x[:10]:
+            self.assertEqual(a.bin(xx), b.bin(xx))
+
+        for n, snap in [(2, 'low'), (2, 'high'), (7, 'low')]:
+            m = a.mergebins(n, snap)
+            self.assertIsInstance(m, UniformAxis)
+            self.assertEqual(m, b.mergebins(n, snap))
+        self.assertEqual(a.mergebins(2, clip=False),
+                         b.mergebins(2, clip=False))
+
+        g = UniformAxis(4, [0, 2], 'x', growth=True)
+        self.assertTrue(g.growth)
+        self.assertFalse(g.isidentical(UniformAxis(4, [0, 2], 'x')))
+        self.assertTrue(eval(repr(g)).isidentical(g))
+        self.assertTrue(HistogramAxis.fromdict(g.asdict()).isidentical(g))
+        self.assertTrue(g.copy().growth)
+        self.assertTrue(g.mergebins().growth)
+        with self.assertRaises(ValueError):
+            UniformAxis(4, [0, 2], flow=True, growth=True)
+
+        c = deepcopy(a)
+        c.edges = [0, 1, 2]
+        self.assertEqual((c.nbins, a.nbins), (2, 7))
+        self.assertIsInstance(c, UniformAxis)
+        # non-uniform edges make it a plain HistogramAxis
+        c.edges = [0, 1, 3]
+        self.assertIs(type(c), HistogramAxis)
+        self.assertTrue(c.isidentical(HistogramAxis([0, 1, 3], 'x')))
+        assert_array_equal(c.bin([0.5, 2, 4]), [0, 1, 2])
+        self.assertEqual(a.nbins, 7)
+        with self.assertRaises(ValueError):
+            g.edges = [0, 1, 3]
+        self.assertTrue(g.growth)
+
+    def test_transformed(self):
+        a = TransformedAxis(6, [1, 1e6], 'log', 'E')
+        b = HistogramAxis(np.logspace(0, 6, 7), 'E')
+        self.assertEqual(a, b)
+        self.assertEqual(b, a)
+        self.assertTrue(eval(repr(a)).isidentical(a))
+        self.assertFalse(a.isuniform())
+        self.assertEqual((a.nbins, a.min, a.max), (6, 1, 1e6))
+        self.assertEqual(a.transform, 'log')
+        self.assertNotEqual(a, TransformedAxis(6, [1, 1e5], 'log'))
+        self.assertTrue(HistogramAxis.fromdict(a.asdict()).isidentical(a))
+
+        b = HistogramAxis(a.edges)
+        x = np.concatenate([a.edges, 10**np.random.uniform(-1, 7, 1000),
+                            [-1, 0, np.nan, np.inf, -np.inf]])
+        assert_array_equal(a.bin(x), b.bin(x))
+        for xx in x[:10]:
+            self.assertEqual(a.bin(xx), b.bin(xx))
+
+        s = TransformedAxis(4, [0, 16], 'sqrt')
+        assert_array_almost_equal(s.edges, [0, 1, 4, 9, 16])
+        self.assertEqual(s.bin(3.99), 1)
+        self.assertEqual(s.bin(4), 2)
+
+        c = TransformedAxis(6, [1, 1e6], (np.log10, lambda t: 10**t))
+        self.assertEqual(a, c)
+        self.assertNotIn('transform', c.asdict())
+
+        for n, snap in [(4, 'low'), (4, 'high'), (3, 'low')]:
+            m = a.mergebins(n, snap)
+            self.assertIsInstance(m, TransformedAxis)
+            self.assertEqual(m, b.mergebins(n, snap))
+        self.assertEqual(a.mergebins(4, clip=False),
+                         b.mergebins(4, clip=False))
+
+        with self.assertRaises(ValueError):
+            TransformedAxis(6, [-1, 1e6], 'log')
+        # log limits starting at or below zero give non-finite edges
+        for limits in [[0, 100], [-np.inf, 100], [-10, -1], [1, np.inf]]:
+            with self.assertRaises(ValueError):
+                TransformedAxis(10, limits, 'log')
+        with self.assertRaises(ValueError):
+            TransformedAxis(4, [-4, 16], 'sqrt')
+        with self.assertRaises(ValueError):
+            a.edges = [0, 1, 10, 100]
+        with self.assertRaises(ValueError):
+            TransformedAxis(6, [1, 1e6], 'exp')
+
+    def test_integer(self):
+        a = IntegerAxis(1000, 1010, 'run')
+        self.assertEqual((a.start, a.stop, a.nbins), (1000, 1010, 10))
+        self.assertEqual(a, HistogramAxis(np.arange(1000, 1011) - 0.5))
+        assert_array_equal(a.bincenters(), np.arange(1000, 1010))
+        self.assertTrue(eval(repr(a)).isidentical(a))
+        self.assertTrue(HistogramAxis.fromdict(a.asdict()).isidentical(a))
+        self.assertTrue(a.copy().isidentical(a))
+        self.assertEqual(a.bin(1003), 3)
+        self.assertEqual(a.bin(1003.4), 3)
+        assert_array_equal(a.bin(np.array([0, 999, 1000, 1009, 1010])),
+                           [-1, -1, 0, 9, 10])
+        c, mask = a.cut(1002, 1004)
+        self.assertTrue(c.isidentical(IntegerAxis(1002, 1005, 'run')))
+        assert_array_equal(np.argwhere(mask)[:, 0], [2, 3, 4])
+        with self.assertRaises(ValueError):
+            a.cut(2000, 3000)
+        with self.assertRaises(AttributeError):
+            a.edges = [0, 1]
+
+    def test_category(self):
+        a = CategoryAxis(['e', 'mu', 'tau'], 'lepton')
+        self.assertEqual(a.nbins, 3)
+        self.assertEqual(a.categories.tolist(), ['e', 'mu', 'tau'])
+        self.assertTrue(eval(repr(a)).isidentical(a))
+        self.assertTrue(HistogramAxis.fromdict(a.asdict()).isidentical(a))
+        self.assertTrue(
+            HistogramAxis.fromdict(a.asdict('utf-8'), 'utf-8').isidentical(a))
+        self.assertTrue(a.copy().isidentical(a))
+        self.assertNotEqual(a, CategoryAxis(['e', 'tau', 'mu']))
+        self.assertNotEqual(a, UniformAxis(3, [-0.5, 2.5]))
+        self.assertEqual(a.bin('tau'), 2)
+        self.assertEqual(a.bin('pi'), 3)
+        self.assertTrue(a.inaxis('mu'))
+        assert_array_equal(a.bin(['mu', 'pi', 'e']), [1, 3, 0])
+        assert_array_equal(a.bin(np.array([1, 2])), [3, 3])
+        x = ['tau', 'm', 'muon', 'zeta', 'a', 'e', '']
+        expected = [2, 3, 3, 3, 3, 0, 3]
+        assert_array_equal(a.bin(np.array(x)), expected)
+        assert_array_equal(a.bin(np.array(x, dtype=object)), expected)
+        s = CategoryAxis(['tau', 'e', 'mu'])
+        assert_array_equal(s.bin(np.array(x)), [0, 3, 3, 3, 3, 1, 3])
+
+        ids = CategoryAxis([17, 3, 101])
+        assert_array_equal(ids.bin([3, 4, 101, 17]), [1, 3, 2, 0])
+        self.assertEqual(ids.bin(101), 2)
+
+        c, mask = a.cut('mu', None)
+        self.assertEqual(c.categories.tolist(), ['mu', 'tau'])
+        assert_array_equal(mask, [False, True, True])
+        with self.assertRaises(ValueError):
+            a.cut('pi', 'tau')
+        with self.assertRaises(ValueError):
+            a.mergebins()
+        if __debug__:
+            with self.assertRaises(ValueError):
+                CategoryAxis(['a', 'a'])
+
 
 if __name__ == '__main__':
     from . import main
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import numpy as np
+import unittest
+
+from tempfile import TemporaryDirectory
+
+from histogram import Histogram, UniformAxis
+from histogram.parallel import fill_files
+
+
+def read(filename):
+    data = np.load(filename)
+    return data['x'], data['y'], data['w']
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_fill_files(self):
+        np.random.seed(1)
+        with TemporaryDirectory() as tmpdir:
+            files = []
+            for i in range(5):
+                filename = os.path.join(tmpdir, '{}.npz'.format(i))
+                x, y = np.random.normal(5, 3, (2, 1000))
+                w = np.random.uniform(0, 2, 1000)
+                np.savez(filename, x=x, y=y, w=w)
+                files.append(filename)
+
+            for kwargs in [{}, {'storage': 'weighted'}, {'flow': True}]:
+                template = Histogram(10, [0, 10], 5, [0, 10],
+                                     dtype=np.float64, **kwargs)
+                template.fill_one((5, 5))
+                expected = template.copy()
+                for filename in files:
+                    expected.fill(*read(filename))
+
+                h = fill_files(files, template, read, processes=2)
+                self.assertTrue(h.isidentical(expected))
+                self.assertEqual(template.data.sum(), 1)
+
+            template = Histogram(10, [0, 10], 5, [0, 10], dtype=np.float64)
+            template.uncert = np.ones(template.shape)
+            h = fill_files(files, template, read, processes=2)
+            self.assertFalse(h.has_uncert)
+            np.testing.assert_array_almost_equal(h.uncert, np.sqrt(h.data))
+
+            with self.assertRaises(ValueError):
+                fill_files(files, Histogram(UniformAxis(10, [0, 10],
+                                                        growth=True)),
+                           read, processes=2)
+
+
+if __name__ == '__main__':
+    from . import main
+    main()
@@ -48,3 +48,16 @@ def test_plot_hist2d():
     ax[1].plothist(h2.smooth(1), style='contour', overlay=True)
 
     pyplot.savefig('test_images/test_plotting_fig_hist2d.png')
+
+def test_plot_profile_unfit_slice():
+    rand.seed(1)
+    h2 = Histogram((5,(0,5),'x'),(20,(-3,3),'y'))
+    # nothing in the first slice to fit
+    h2.fill(rand.uniform(1,5,5000), rand.normal(0,1,5000))
+    fig,ax = pyplot.subplots()
+    try:
+        ax.plothist_profile(h2)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('expected ValueError')
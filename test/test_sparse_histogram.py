@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, unicode_literals
+
+import numpy as np
+import unittest
+
+from numpy.testing import assert_array_almost_equal, assert_array_equal
+
+from histogram import Histogram, SparseHistogram
+
+
+class TestSparseHistogram(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(1)
+        self.sample = np.random.normal(5, 2, (3, 1000))
+        self.weights = np.random.uniform(0, 2, 1000)
+        self.axes = [10, [0, 10], 5, [0, 10], 8, [2, 8]]
+
+    def test___init__(self):
+        h = SparseHistogram(10, [0, 1], 'x', 'counts', 'title')
+        self.assertEqual(h.shape, (10,))
+        self.assertEqual(h.label, 'counts')
+        self.assertEqual(h.title, 'title')
+        self.assertEqual(h.nnz, 0)
+        with self.assertRaises(TypeError):
+            SparseHistogram()
+        with self.assertRaises(ValueError):
+            SparseHistogram(Histogram(10, [0, 1], flow=True).axes[0])
+
+    def test_large(self):
+        h = SparseHistogram(*([200, [0, 10]] * 5))
+        self.assertEqual(h.size, 200**5)
+        h.fill_from_sample(np.random.normal(5, 0.2, (5, 10000)))
+        self.assertLessEqual(h.nnz, 10000)
+        self.assertEqual(h.sum().nominal_value, 10000)
+        self.assertEqual(h.projection(2).todense().data.sum(), 10000)
+
+    def test_fill(self):
+        hd = Histogram(*self.axes, storage='weighted', dtype=np.float64)
+        hs = SparseHistogram(*self.axes, dtype=np.float64, compact=100)
+        hd.fill_from_sample(self.sample, self.weights)
+        for i in range(0, 1000, 50):
+            hs.fill(*(list(self.sample[:, i:i + 50]) +
+                      [self.weights[i:i + 50]]))
+        hs.fill_one(self.sample[:, 0], 2)
+        hd.fill_one(self.sample[:, 0], 2)
+        self.assertTrue(hs.todense().isidentical(hd))
+
+        hs2 = SparseHistogram.fromdense(hd)
+        assert_array_equal(hs2.bins, hs.bins)
+        assert_array_almost_equal(hs2.values, hs.values)
+        assert_array_almost_equal(hs2.variance, hs.variance)
+
+    def test___call__(self):
+        h = SparseHistogram(3, [0, 3], 2, [0, 2])
+        h.fill([0.5, 2.5, 2.5], [0.5, 1.5, 1.5])
+        self.assertEqual(h(0.5, 0.5), 1)
+        self.assertEqual(h(1.5, 0.5), 0)
+        assert_array_equal(h([0.5, 2.5, 1.5, 5], 1.5), [0, 2, 0, 0])
+        assert_array_equal(h([5, 2.5], 1.5, overflow_value=-1), [-1, 2])
+
+        # the upper edge is outside, as for Histogram
+        d = h.todense()
+        for x, y in [(2.5, 2), (3, 1.5), (3, 2)]:
+            self.assertEqual(h(x, y, overflow_value=-1), -1)
+            self.assertEqual(h(x, y, overflow_value=-1),
+                             d(x, y, overflow_value=-1))
+        assert_array_equal(h([2.5, 2.5], [1.5, 2], overflow_value=-1),
+                           d(np.array([2.5, 2.5]), [1.5, 2], overflow_value=-1))
+
+    def test_sum_cut(self):
+        hd = Histogram(*self.axes)
+        hs = SparseHistogram(*self.axes)
+        hd.fill_from_sample(self.sample)
+        hs.fill_from_sample(self.sample)
+        self.assertEqual(hs.sum().nominal_value, hd.sum().nominal_value)
+        assert_array_equal(hs.sum(0, 2).todense().data, hd.sum(0, 2).data)
+        assert_array_equal(hs.projection(1).todense().data,
+                           hd.projection(1).data)
+        hscut = hs.cut((2, 7), (None, None), (3, 5))
+        hdcut = hd.cut((2, 7), (None, None), (3, 5))
+        self.assertEqual(hscut.shape, hdcut.shape)
+        assert_array_equal(hscut.todense().data, hdcut.data)
+
+    def test_arithmetic(self):
+        h1 = SparseHistogram(*self.axes)
+        h2 = SparseHistogram(*self.axes)
+        h1.fill_from_sample(self.sample[:, :500])
+        h2.fill_from_sample(self.sample[:, 500:])
+        d1, d2 = h1.todense(), h2.todense()
+
+        h = h1 + h2
+        self.assertTrue(h.todense().isidentical(d1 + d2))
+        h = h1 - h2
+        self.assertTrue(h.todense().isidentical(d1 - d2))
+        h = 2 * h1 / 4
+        self.assertTrue(h.todense().isidentical(2 * d1 / 4))
+        self.assertIsInstance(h1 + d2, Histogram)
+        self.assertTrue((h1 + d2).isidentical(d1 + d2))
+        self.assertTrue((d2 + h1).isidentical(d2 + d1))
+        self.assertTrue((d2 - h1).isidentical(d2 - d1))
+        d = d2.copy()
+        d += h1
+        self.assertTrue(d.isidentical(d2 + d1))
+        h = sum([h1, h2])
+        self.assertIsInstance(h, SparseHistogram)
+        self.assertTrue(h.todense().isidentical(d1 + d2))
+        with self.assertRaises(TypeError):
+            1 + h1
+
+        with self.assertRaises(ValueError):
+            h1 + SparseHistogram(3, [0, 1])
+
+
+if __name__ == '__main__':
+    from . import main
+    main()